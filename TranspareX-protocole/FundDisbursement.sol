@@ -38,6 +38,25 @@ contract FundManagement {
         emit FundsReleased(recipient, amount);
     }
 
+    // Release funds to several recipients in a single transaction
+    function releaseFundsBatch(address payable[] calldata recipients, uint256[] calldata amounts) external onlyOwner {
+        require(recipients.length == amounts.length, "Recipients and amounts must have the same length");
+        
+        uint256 total = 0;
+        for (uint256 i = 0; i < amounts.length; i++) {
+            require(amounts[i] > 0, "Amount must be greater than zero");
+            total += amounts[i];
+        }
+        require(balances[owner] >= total, "Insufficient funds in the contract");
+        
+        balances[owner] -= total;
+        for (uint256 i = 0; i < recipients.length; i++) {
+            recipients[i].transfer(amounts[i]);
+            fundsReleased[recipients[i]] += amounts[i];
+            emit FundsReleased(recipients[i], amounts[i]);
+        }
+    }
+
     // Get the balance of the contract
     function getContractBalance() external view returns (uint256) {
         return address(this).balance;
@@ -1,41 +1,171 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context, url_for
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from config import Config
-from models import db, User, Fund, Transaction, AuditLog
-from auth_service import token_required, admin_required, register_user, authenticate_user, log_audit
+from models import db, User, Fund, Transaction, AuditLog, BlockchainEvent, DisbursementJob
+from auth_service import token_required, stream_ticket_required, issue_stream_ticket, admin_required, register_user, authenticate_user, log_audit
+import auth_service
 from blockchain_service import blockchain_service
+from event_indexer import event_indexer
+from confirmation_tracker import confirmation_tracker
+from event_hub import event_hub, EventStreamFull
+from audit_writer import audit_writer
+from disbursement_queue import disbursement_queue
+from stats_service import get_dashboard_counters, get_fund_counters, stats_initialized, rebuild_stats
+import migrations
+import fund_reservations
+import export_service
+from http_cache import versioned, response_cache
+from password_hasher import password_hasher, PasswordHasherBusy
+from serializers import json_response, column_query, row_dicts, fund_dicts
+from metrics import metrics
+from pagination import keyset_page, decode_cursor, parse_limit, parse_datetime, parse_float
 from datetime import datetime
 import logging
+import re
+import threading
+import time
+import uuid
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TX_HASH_PATTERN = re.compile(r'^0x[0-9a-fA-F]{64}$')
+
+def init_database(upgrade=True):
+    """Bring the schema up to date and seed it, returns False while migrations are pending"""
+    if upgrade:
+        migrations.upgrade()
+    
+    pending = migrations.pending_revisions()
+    if pending:
+        # The models do not match the schema yet, only the db commands can run
+        logger.warning(f"Database has pending migrations {', '.join(pending)}, run 'flask --app app db upgrade'")
+        return False
+    
+    # Create default admin user if it doesn't exist
+    admin_user = User.query.filter_by(email='admin@transparex.com').first()
+    if not admin_user:
+        admin_user = User(
+            username='admin',
+            email='admin@transparex.com',
+            role='admin'
+        )
+        admin_user.set_password('admin123')
+        db.session.add(admin_user)
+        db.session.commit()
+        logger.info("Default admin user created: admin@transparex.com / admin123")
+    
+    # Build the dashboard counters once for databases created before they existed
+    if not stats_initialized():
+        rebuild_stats()
+    return True
+
+_services_lock = threading.Lock()
+
+def start_background_services(app):
+    """Start the audit writer, chain heartbeat, event indexer and disbursement workers once per process"""
+    if app.extensions.get('background_services'):
+        return
+    
+    with _services_lock:
+        if app.extensions.get('background_services'):
+            return
+        app.extensions['background_services'] = True
+        
+        # Buffer audit entries and insert them in bulk
+        audit_writer.start()
+        
+        # Track node connectivity in the background
+        blockchain_service.heartbeat.start()
+        
+        # Start indexing FundReleased events in the background
+        if app.config['EVENT_INDEXER_ENABLED']:
+            event_indexer.start()
+        
+        # Process queued disbursements in worker threads
+        if app.config['DISBURSEMENT_WORKERS_ENABLED']:
+            disbursement_queue.start()
+        
+        # Follow submitted disbursements until they are confirmed
+        if app.config['CONFIRMATION_TRACKER_ENABLED']:
+            confirmation_tracker.start()
+
+def stop_background_services(app, timeout=None):
+    """Stop the background services, letting running jobs finish and flushing audit entries"""
+    if not app.extensions.pop('background_services', None):
+        return
+    
+    disbursement_queue.stop(timeout)
+    confirmation_tracker.stop(timeout)
+    event_indexer.stop(timeout)
+    blockchain_service.heartbeat.stop(timeout)
+    audit_writer.stop()
+    password_hasher.shutdown()
+
 def create_app():
+    """Build the application without touching the database or the node"""
     app = Flask(__name__)
     app.config.from_object(Config)
     
     # Initialize extensions
     db.init_app(app)
     CORS(app)
+    metrics.init_app(app)
+    
+    # Bind the background services, they start with the first request
+    audit_writer.init_app(app)
+    event_hub.init_app(app)
+    event_indexer.init_app(app)
+    confirmation_tracker.init_app(app)
+    disbursement_queue.init_app(app)
+    
+    @app.before_request
+    def start_services_on_first_request():
+        start_background_services(app)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-        
-        # Create default admin user if it doesn't exist
-        admin_user = User.query.filter_by(email='admin@transparex.com').first()
-        if not admin_user:
-            admin_user = User(
-                username='admin',
-                email='admin@transparex.com',
-                role='admin'
-            )
-            admin_user.set_password('admin123')
-            db.session.add(admin_user)
-            db.session.commit()
-            logger.info("Default admin user created: admin@transparex.com / admin123")
+    @app.cli.command('disbursement-worker')
+    def disbursement_worker_command():
+        """Run disbursement workers, the confirmation tracker and the event indexer in the foreground, for a dedicated worker process"""
+        disbursement_queue.start()
+        if app.config['CONFIRMATION_TRACKER_ENABLED']:
+            confirmation_tracker.start()
+        if app.config['EVENT_INDEXER_ENABLED']:
+            event_indexer.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            disbursement_queue.stop()
+            confirmation_tracker.stop()
+            event_indexer.stop()
+    
+    app.cli.add_command(migrations.db_cli)
+    
+    @app.cli.command('index-events')
+    def index_events_command():
+        """Index new FundReleased events up to the chain head"""
+        stored = event_indexer.sync_once()
+        print(f"Indexed {stored} new events, checkpoint at block {event_indexer.get_checkpoint()}")
+    
+    @app.cli.command('track-confirmations')
+    def track_confirmations_command():
+        """Check the receipts of submitted transactions once"""
+        finalized = confirmation_tracker.sync_once()
+        print(f"Finalized {finalized} transactions")
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Apply migrations, create the default admin user and build the dashboard counters"""
+        if init_database():
+            print("Database initialized")
+    
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Recompute the dashboard counters from the transaction table"""
+        count = rebuild_stats()
+        print(f"Rebuilt {count} dashboard counters")
     
     return app
 
@@ -56,6 +186,29 @@ def health_check():
         "timestamp": datetime.utcnow().isoformat()
     })
 
+@app.route('/api/health/details')
+@token_required
+@admin_required
+def health_details(current_user):
+    """Chain, cache, hasher, RPC and event stream state for operators"""
+    blockchain_status = "connected" if blockchain_service.is_connected() else "disconnected"
+    return jsonify({
+        "status": "healthy",
+        "blockchain": blockchain_status,
+        "chain": blockchain_service.heartbeat.snapshot(),
+        "rpc_cache": blockchain_service.view_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "rpc_latency": blockchain_service.web3.provider.latency.snapshot(),
+        "event_stream": event_hub.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Request, SQL and JSON-RPC metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Authentication routes
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -73,6 +226,8 @@ def register():
         status_code = 201 if result["success"] else 400
         return jsonify(result), status_code
         
+    except PasswordHasherBusy as e:
+        return jsonify({"success": False, "message": str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
@@ -91,19 +246,22 @@ def login():
         status_code = 200 if result["success"] else 401
         return jsonify(result), status_code
         
+    except PasswordHasherBusy as e:
+        return jsonify({"success": False, "message": str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
 # Fund management routes
 @app.route('/api/funds', methods=['GET'])
 @token_required
+@versioned('fund')
 def get_funds(current_user):
     """Get all funds"""
     try:
-        funds = Fund.query.all()
-        return jsonify({
+        funds = column_query(Fund).all()
+        return json_response({
             "success": True,
-            "funds": [fund.to_dict() for fund in funds]
+            "funds": fund_dicts(funds)
         })
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -152,27 +310,73 @@ def create_fund(current_user):
         return jsonify({"success": False, "message": str(e)}), 500
 
 # Transaction routes
+def filter_transactions(query, args, current_user):
+    """Apply the list filters shared by transaction endpoints"""
+    if current_user.role == 'admin':
+        user_id = args.get('user_id', type=int)
+        if user_id is not None:
+            query = query.filter(Transaction.user_id == user_id)
+    else:
+        query = query.filter(Transaction.user_id == current_user.id)
+    
+    status = args.get('status')
+    if status:
+        query = query.filter(Transaction.status.in_(status.split(',')))
+    
+    fund_id = args.get('fund_id', type=int)
+    if fund_id is not None:
+        query = query.filter(Transaction.fund_id == fund_id)
+    
+    created_from = parse_datetime(args.get('created_from'), 'created_from')
+    if created_from:
+        query = query.filter(Transaction.created_at >= created_from)
+    
+    created_to = parse_datetime(args.get('created_to'), 'created_to')
+    if created_to:
+        query = query.filter(Transaction.created_at < created_to)
+    
+    min_amount = parse_float(args.get('min_amount'), 'min_amount')
+    if min_amount is not None:
+        query = query.filter(Transaction.amount >= min_amount)
+    
+    max_amount = parse_float(args.get('max_amount'), 'max_amount')
+    if max_amount is not None:
+        query = query.filter(Transaction.amount <= max_amount)
+    
+    return query
+
+def is_regular_user(current_user):
+    return current_user.role != 'admin'
+
 @app.route('/api/transactions', methods=['GET'])
 @token_required
+@versioned('transaction', per_user=is_regular_user)
 def get_transactions(current_user):
-    """Get user's transactions"""
+    """Get user's transactions, newest first, one page at a time"""
     try:
-        if current_user.role == 'admin':
-            transactions = Transaction.query.all()
-        else:
-            transactions = Transaction.query.filter_by(user_id=current_user.id).all()
+        query = filter_transactions(column_query(Transaction), request.args, current_user)
+        transactions, next_cursor = keyset_page(
+            query,
+            Transaction.created_at,
+            Transaction.id,
+            cursor=request.args.get('cursor'),
+            limit=parse_limit(request.args.get('limit'))
+        )
         
-        return jsonify({
+        return json_response({
             "success": True,
-            "transactions": [tx.to_dict() for tx in transactions]
+            "transactions": row_dicts(transactions),
+            "next_cursor": next_cursor
         })
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
 @app.route('/api/transactions', methods=['POST'])
 @token_required
 def create_transaction(current_user):
-    """Create a new transaction"""
+    """Create a new transaction and queue its on-chain release"""
     try:
         data = request.get_json()
         fund_id = data.get('fund_id')
@@ -182,15 +386,20 @@ def create_transaction(current_user):
         if not all([fund_id, recipient_address, amount]):
             return jsonify({"success": False, "message": "Missing required fields"}), 400
         
-        # Check if fund exists and has sufficient balance
+        # The contract call only takes checksummed addresses
+        recipient_address = blockchain_service.normalize_address(recipient_address)
+        if not recipient_address:
+            return jsonify({"success": False, "message": "Invalid recipient address"}), 400
+        
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount <= 0:
+            return jsonify({"success": False, "message": "Amount must be a positive number"}), 400
+        
+        # Check if fund exists
         fund = Fund.query.get(fund_id)
         if not fund:
             return jsonify({"success": False, "message": "Fund not found"}), 404
         
-        if fund.remaining_amount < amount:
-            return jsonify({"success": False, "message": "Insufficient fund balance"}), 400
-        
-        # Create transaction
+        # Create transaction, its reservation and its disbursement job in one commit
         transaction = Transaction(
             fund_id=fund_id,
             user_id=current_user.id,
@@ -200,22 +409,17 @@ def create_transaction(current_user):
         )
         
         db.session.add(transaction)
-        db.session.commit()
-        
-        # Release funds via blockchain
-        blockchain_result = blockchain_service.release_funds(recipient_address, amount)
+        db.session.flush()
         
-        if blockchain_result["success"]:
-            transaction.status = 'completed'
-            transaction.transaction_hash = blockchain_result["transaction_hash"]
-            transaction.completed_at = datetime.utcnow()
-            
-            # Update fund remaining amount
-            fund.remaining_amount -= amount
-        else:
-            transaction.status = 'failed'
+        # Hold the amount until the release settles. Flushing first locks the counter
+        # rows before the fund row, in the same order as the disbursement workers.
+        if not fund_reservations.reserve(fund_id, amount):
+            db.session.rollback()
+            return jsonify({"success": False, "message": "Insufficient fund balance"}), 400
         
+        disbursement_queue.enqueue(transaction)
         db.session.commit()
+        disbursement_queue.notify()
         
         log_audit(
             current_user.id,
@@ -227,15 +431,130 @@ def create_transaction(current_user):
         
         return jsonify({
             "success": True,
-            "message": "Transaction processed",
+            "message": "Transaction queued for release",
             "transaction": transaction.to_dict(),
-            "blockchain_result": blockchain_result
-        }), 201
+            "status_url": url_for('get_transaction_status', transaction_id=transaction.id)
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@app.route('/api/transactions/batch', methods=['POST'])
+@token_required
+def create_transaction_batch(current_user):
+    """Create many transactions against one fund and queue them as batched releases"""
+    try:
+        data = request.get_json()
+        fund_id = data.get('fund_id')
+        items = data.get('items')
+        
+        if not fund_id or not isinstance(items, list) or not items:
+            return jsonify({"success": False, "message": "fund_id and a non-empty items list are required"}), 400
+        
+        if len(items) > app.config['BATCH_MAX_ITEMS']:
+            return jsonify({"success": False, "message": f"A batch is limited to {app.config['BATCH_MAX_ITEMS']} items"}), 400
+        
+        fund = Fund.query.get(fund_id)
+        if not fund:
+            return jsonify({"success": False, "message": "Fund not found"}), 404
+        
+        # Validate every item, rejecting bad ones individually
+        results = []
+        accepted = []
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            recipient_address = blockchain_service.normalize_address(item.get('recipient_address'))
+            amount = item.get('amount')
+            
+            if not recipient_address:
+                results.append({"index": index, "status": "rejected", "message": "Invalid recipient address"})
+            elif isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount <= 0:
+                results.append({"index": index, "status": "rejected", "message": "Amount must be a positive number"})
+            else:
+                results.append({"index": index, "status": "queued"})
+                accepted.append((index, recipient_address, amount))
+        
+        if not accepted:
+            return jsonify({"success": False, "message": "No valid items in batch", "results": results}), 400
+        
+        # Insert every row, the reservation and one job per on-chain chunk in a single commit
+        chunk_size = blockchain_service.batch_size()
+        batch_ids = []
+        transactions = []
+        for offset in range(0, len(accepted), chunk_size):
+            batch_id = str(uuid.uuid4())
+            batch_ids.append(batch_id)
+            for index, recipient_address, amount in accepted[offset:offset + chunk_size]:
+                transactions.append(Transaction(
+                    fund_id=fund_id,
+                    user_id=current_user.id,
+                    recipient_address=recipient_address,
+                    amount=amount,
+                    status='pending',
+                    batch_id=batch_id
+                ))
+            disbursement_queue.enqueue_batch(batch_id)
+        
+        db.session.add_all(transactions)
+        db.session.flush()
+        
+        total_amount = sum(amount for _, _, amount in accepted)
+        if not fund_reservations.reserve(fund_id, total_amount):
+            db.session.rollback()
+            return jsonify({"success": False, "message": "Insufficient fund balance for batch"}), 400
+        
+        db.session.commit()
+        disbursement_queue.notify()
+        
+        for (index, _, _), transaction in zip(accepted, transactions):
+            results[index]["transaction_id"] = transaction.id
+            results[index]["batch_id"] = transaction.batch_id
+        
+        log_audit(
+            current_user.id,
+            "Batch Transaction Created",
+            f"Batch created: {len(transactions)} transactions totalling {total_amount} from fund {fund_id}",
+            request.remote_addr,
+            request.headers.get('User-Agent')
+        )
+        
+        return jsonify({
+            "success": True,
+            "message": f"{len(transactions)} transactions queued in {len(batch_ids)} batches",
+            "accepted": len(transactions),
+            "rejected": len(items) - len(transactions),
+            "batch_ids": batch_ids,
+            "results": results
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route('/api/transactions/<int:transaction_id>/status')
+@token_required
+def get_transaction_status(current_user, transaction_id):
+    """Get the processing status of a transaction"""
+    try:
+        transaction = db.session.get(Transaction, transaction_id)
+        if not transaction or (current_user.role != 'admin' and transaction.user_id != current_user.id):
+            return jsonify({"success": False, "message": "Transaction not found"}), 404
+        
+        if transaction.batch_id:
+            job = DisbursementJob.query.filter_by(batch_id=transaction.batch_id).first()
+        else:
+            job = DisbursementJob.query.filter_by(transaction_id=transaction_id).first()
+        return jsonify({
+            "success": True,
+            "transaction_id": transaction.id,
+            "status": transaction.status,
+            "transaction_hash": transaction.transaction_hash,
+            "job": job.to_dict() if job else None
+        })
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
 # Blockchain routes
 @app.route('/api/blockchain/balance')
 @token_required
@@ -253,12 +572,18 @@ def get_blockchain_balance(current_user):
 @app.route('/api/blockchain/events')
 @token_required
 def get_blockchain_events(current_user):
-    """Get blockchain events"""
+    """Get blockchain events from the local event index"""
     try:
-        events = blockchain_service.get_fund_released_events()
+        query = BlockchainEvent.query
+        from_block = request.args.get('from_block', type=int)
+        if from_block is not None:
+            query = query.filter(BlockchainEvent.block_number >= from_block)
+        
+        events = query.order_by(BlockchainEvent.block_number, BlockchainEvent.log_index).all()
         return jsonify({
             "success": True,
-            "events": events
+            "events": [event.to_dict() for event in events],
+            "indexed_block": event_indexer.get_checkpoint()
         })
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -279,24 +604,63 @@ def get_transaction_details(current_user, tx_hash):
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route('/api/blockchain/transactions', methods=['POST'])
+@token_required
+def get_transactions_details(current_user):
+    """Get details of several transactions from the blockchain in one round trip"""
+    try:
+        data = request.get_json()
+        hashes = data.get('hashes') if isinstance(data, dict) else None
+        
+        if not isinstance(hashes, list) or not hashes:
+            return jsonify({"success": False, "message": "A non-empty hashes list is required"}), 400
+        
+        if len(hashes) > app.config['BLOCKCHAIN_BATCH_MAX_HASHES']:
+            return jsonify({"success": False, "message": f"At most {app.config['BLOCKCHAIN_BATCH_MAX_HASHES']} hashes per request"}), 400
+        
+        if not blockchain_service.is_connected():
+            return jsonify({"success": False, "message": "Not connected to blockchain"}), 503
+        
+        valid_hashes = [tx_hash for tx_hash in hashes if isinstance(tx_hash, str) and TX_HASH_PATTERN.match(tx_hash)]
+        lookups = iter(blockchain_service.get_transaction_details_batch(valid_hashes))
+        
+        results = []
+        for tx_hash in hashes:
+            if not isinstance(tx_hash, str) or not TX_HASH_PATTERN.match(tx_hash):
+                results.append({"transaction_hash": tx_hash, "found": False, "message": "Invalid transaction hash"})
+                continue
+            
+            lookup = next(lookups)
+            if "transaction" in lookup:
+                results.append({"transaction_hash": tx_hash, "found": True, "transaction": lookup["transaction"]})
+            else:
+                results.append({"transaction_hash": tx_hash, "found": False, "message": lookup["error"]})
+        
+        return jsonify({
+            "success": True,
+            "transactions": results
+        })
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
 # Dashboard routes
+def chain_head():
+    """Latest block seen by the heartbeat, the contract balance can only change with it"""
+    blockchain_service.heartbeat.ensure_fresh()
+    return blockchain_service.heartbeat.latest_block
+
 @app.route('/api/dashboard/stats')
 @token_required
+@versioned('fund', 'transaction', extra=chain_head)
 def get_dashboard_stats(current_user):
     """Get dashboard statistics"""
     try:
-        total_funds = Fund.query.count()
-        total_transactions = Transaction.query.count()
-        completed_transactions = Transaction.query.filter_by(status='completed').count()
-        total_amount_disbursed = db.session.query(db.func.sum(Transaction.amount)).filter_by(status='completed').scalar() or 0
-        
-        stats = {
-            "total_funds": total_funds,
-            "total_transactions": total_transactions,
-            "completed_transactions": completed_transactions,
-            "total_amount_disbursed": total_amount_disbursed,
-            "blockchain_balance": blockchain_service.get_contract_balance()
-        }
+        stats = get_dashboard_counters()
+        stats["blockchain_balance"] = blockchain_service.get_contract_balance()
+        
+        fund_id = request.args.get('fund_id', type=int)
+        if fund_id is not None:
+            stats["fund"] = get_fund_counters(fund_id)
         
         return jsonify({
             "success": True,
@@ -305,18 +669,113 @@ def get_dashboard_stats(current_user):
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route('/api/stream/ticket', methods=['POST'])
+@token_required
+def create_stream_ticket(current_user):
+    """Issue a single-use ticket for opening /api/stream from a browser"""
+    try:
+        return jsonify({
+            "success": True,
+            "ticket": issue_stream_ticket(current_user.id),
+            "expires_in": app.config['STREAM_TICKET_TTL']
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@app.route('/api/stream')
+@stream_ticket_required
+def event_stream(current_user):
+    """Push stat deltas, FundReleased events and transaction updates as Server-Sent Events"""
+    try:
+        subscription = event_hub.subscribe(current_user)
+    except EventStreamFull as e:
+        return jsonify({"success": False, "message": str(e)}), 503, {'Retry-After': '30'}
+    response = Response(
+        event_hub.listen(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Frees the stream slot even if the client leaves before the first message
+    response.call_on_close(lambda: event_hub.unsubscribe(subscription))
+    return response
+
 # Audit routes
+def parse_audit_filters(args):
+    """Parse the filters shared by audit log endpoints"""
+    return dict(
+        user_id=args.get('user_id', type=int),
+        action=args.get('action'),
+        ip_address=args.get('ip_address'),
+        created_from=parse_datetime(args.get('created_from'), 'created_from'),
+        created_to=parse_datetime(args.get('created_to'), 'created_to')
+    )
+
 @app.route('/api/audit/logs')
 @token_required
 @admin_required
+@versioned('audit_log')
 def get_audit_logs(current_user):
-    """Get audit logs (admin only)"""
+    """Get audit logs (admin only), newest first, one page at a time"""
     try:
-        logs = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(100).all()
-        return jsonify({
-            "success": True,
-            "logs": [log.to_dict() for log in logs]
-        })
+        args = request.args
+        cursor = args.get('cursor')
+        if cursor:
+            decode_cursor(cursor)
+        
+        result = auth_service.get_audit_logs(
+            **parse_audit_filters(args),
+            cursor=cursor,
+            limit=parse_limit(args.get('limit'), default=100),
+            include_counts=args.get('counts', 'false').lower() == 'true'
+        )
+        return json_response(result, 200 if result["success"] else 500)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+def export_response(name, model, query, args):
+    """Stream every row of a filtered column query as a CSV or NDJSON download"""
+    fmt = args.get('format', 'csv')
+    if fmt not in export_service.FORMATS:
+        raise ValueError(f"format must be one of {', '.join(export_service.FORMATS)}")
+    compress = args.get('gzip', 'false').lower() == 'true'
+    
+    columns = [column.name for column in model.__table__.columns]
+    query = query.order_by(model.created_at, model.id)
+    filename = f"{name}.{fmt}.gz" if compress else f"{name}.{fmt}"
+    
+    return Response(
+        stream_with_context(export_service.stream_rows(query, columns, fmt, compress)),
+        mimetype='application/gzip' if compress else export_service.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@app.route('/api/export/transactions')
+@token_required
+def export_transactions(current_user):
+    """Export transactions matching the list filters, oldest first"""
+    try:
+        query = filter_transactions(db.session.query(*Transaction.__table__.columns), request.args, current_user)
+        return export_response('transactions', Transaction, query, request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@app.route('/api/export/audit')
+@token_required
+@admin_required
+def export_audit_logs(current_user):
+    """Export audit logs matching the list filters (admin only), oldest first"""
+    try:
+        query = auth_service.filter_audit_logs(
+            db.session.query(*AuditLog.__table__.columns), **parse_audit_filters(request.args)
+        )
+        return export_response('audit', AuditLog, query, request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
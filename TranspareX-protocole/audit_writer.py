@@ -0,0 +1,240 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import has_app_context
+from models import db, AuditLog
+from table_versions import bump
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows, the spill file is then only safe for a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def _file_lock(path, mode, blocking=True):
+    """Hold an flock on path across processes, yields False if non-blocking and taken"""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, mode if blocking else mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class AuditWriter:
+    """Write-behind buffer for audit log entries.
+    
+    Requests only put entries on a bounded in-memory queue; a background thread
+    inserts them in bulk once AUDIT_BATCH_SIZE entries are waiting or
+    AUDIT_FLUSH_INTERVAL has passed, and drains the queue on shutdown. When the
+    queue is full, entries go to AUDIT_SPILL_PATH if set (replayed by the writer
+    thread on the next start) and are otherwise written inline. A batch the
+    database rejects is spilled too, or without a spill path kept by the thread and retried every
+    AUDIT_FLUSH_INTERVAL ahead of newer entries. Entries are lost only when the
+    database still fails at shutdown and there is no spill path.
+    """
+    
+    def __init__(self):
+        self.app = None
+        self.sync = True
+        self._queue = queue.Queue(maxsize=Config.AUDIT_QUEUE_SIZE)
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._retry = []  # batch the database rejected, written before newer entries
+        self._atexit_registered = False
+    
+    def init_app(self, app):
+        """Bind the writer to a Flask application"""
+        self.app = app
+        self.sync = app.config['AUDIT_SYNC']
+    
+    def start(self):
+        """Start the background writer thread, unless running in synchronous mode"""
+        if self.sync or (self._thread and self._thread.is_alive()):
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+    
+    def stop(self, timeout=10):
+        """Stop the writer thread after flushing every buffered entry"""
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+    
+    def submit(self, entry):
+        """Record an audit entry, dict of AuditLog column values"""
+        entry.setdefault('created_at', datetime.utcnow())
+        
+        if self.sync or not self._thread:
+            self._write([entry])
+            return
+        
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            if not self._spill([entry]):
+                logger.warning("Audit queue full, writing entry inline")
+                self._write([entry])
+    
+    def flush(self):
+        """Write every queued entry now"""
+        batch, self._retry = self._retry + self._drain(Config.AUDIT_QUEUE_SIZE), []
+        if batch:
+            try:
+                self._write(batch)
+            except Exception:
+                logger.error(f"Lost {len(batch)} audit entries, the database is failing and AUDIT_SPILL_PATH is not set")
+    
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        try:
+            self.replay_spill()
+        except Exception as e:
+            logger.error(f"Failed to replay spilled audit entries: {str(e)}")
+        
+        while not self._stop_event.is_set():
+            if self._retry:
+                if self._stop_event.wait(Config.AUDIT_FLUSH_INTERVAL):
+                    break
+                self._write_or_hold(self._retry)
+                continue
+            
+            deadline = time.monotonic() + Config.AUDIT_FLUSH_INTERVAL
+            batch = []
+            while len(batch) < Config.AUDIT_BATCH_SIZE and not self._stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                batch.extend(self._drain(Config.AUDIT_BATCH_SIZE - len(batch)))
+            
+            if batch:
+                self._write_or_hold(batch)
+    
+    def _write_or_hold(self, batch):
+        """Write a batch from the writer thread, keeping it for a retry if that fails"""
+        try:
+            self._write(batch)
+            self._retry = []
+        except Exception:
+            self._retry = batch
+    
+    def _write(self, entries):
+        """Insert entries with one bulk INSERT, spilling them if the database fails.
+        
+        Raises when neither works, so the caller can keep or report the entries.
+        """
+        try:
+            if self.app and not has_app_context():
+                with self.app.app_context():
+                    self._insert(entries)
+            else:
+                self._insert(entries)
+        except Exception as e:
+            logger.error(f"Failed to write {len(entries)} audit entries: {str(e)}")
+            if not self._spill(entries):
+                raise
+    
+    @staticmethod
+    def _insert(entries):
+        try:
+            db.session.execute(AuditLog.__table__.insert(), entries)
+            bump(db.session.connection(), 'audit_log')
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    
+    def _spill(self, entries):
+        """Append entries to the spill file, returns False when spilling is disabled"""
+        if not Config.AUDIT_SPILL_PATH:
+            return False
+        try:
+            # Shared with other spilling processes, a replay takes it exclusively to rename the file
+            with self._spill_lock, _file_lock(Config.AUDIT_SPILL_PATH + '.lock', fcntl and fcntl.LOCK_SH), \
+                    open(Config.AUDIT_SPILL_PATH, 'a') as spill_file:
+                for entry in entries:
+                    spill_file.write(json.dumps(dict(entry, created_at=entry['created_at'].isoformat())) + '\n')
+            return True
+        except OSError as e:
+            logger.error(f"Failed to spill audit entries: {str(e)}")
+            return False
+    
+    def replay_spill(self):
+        """Insert entries left in the spill file by a previous run.
+        
+        Only one process replays at a time, the others return 0. A replay file left by a
+        run that died while replaying is finished first. An entry may be inserted twice
+        if the process dies in the middle of a replay, but none is lost.
+        """
+        path = Config.AUDIT_SPILL_PATH
+        if not path:
+            return 0
+        
+        replay_path = path + '.replay'
+        with _file_lock(replay_path + '.lock', fcntl and fcntl.LOCK_EX, blocking=False) as acquired:
+            if not acquired:
+                return 0
+            
+            replayed = 0
+            if os.path.exists(replay_path):
+                replayed += self._replay_file(replay_path)
+            if os.path.exists(path):
+                with self._spill_lock, _file_lock(path + '.lock', fcntl and fcntl.LOCK_EX):
+                    os.replace(path, replay_path)
+                replayed += self._replay_file(replay_path)
+            
+            if replayed:
+                logger.info(f"Replayed {replayed} spilled audit entries")
+            return replayed
+    
+    def _replay_file(self, replay_path):
+        """Write the entries of a renamed spill file, then delete it"""
+        with open(replay_path) as replay_file:
+            entries = [json.loads(line) for line in replay_file if line.strip()]
+        for entry in entries:
+            entry['created_at'] = datetime.fromisoformat(entry['created_at'])
+        
+        # Raises before the file is removed if entries can be neither inserted nor spilled again
+        for offset in range(0, len(entries), Config.AUDIT_BATCH_SIZE):
+            self._write(entries[offset:offset + Config.AUDIT_BATCH_SIZE])
+        os.remove(replay_path)
+        return len(entries)
+
+# Global instance
+audit_writer = AuditWriter()
@@ -1,42 +1,222 @@
 import jwt
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
-from models import User, AuditLog, db
+from sqlalchemy import event
+from models import User, AuditLog, StreamTicket, db
+from audit_writer import audit_writer
+from password_hasher import password_hasher, PasswordHasherBusy
 from config import Config
+from pagination import keyset_page
+from serializers import column_query, row_dicts
 
-def token_required(f):
-    """Decorator to require authentication token"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            current_app.logger.warning('Token is missing in request')
-            return jsonify({'message': 'Token is missing!'}), 401
-        
-        try:
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
+class Principal:
+    """Authenticated user as seen by request handlers, detached from the session"""
+    __slots__ = ('id', 'username', 'email', 'role', 'is_active', 'created_at')
+    
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.role = user.role
+        self.is_active = user.is_active
+        self.created_at = user.created_at
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'role': self.role,
+            'created_at': self.created_at.isoformat(),
+            'is_active': self.is_active
+        }
+
+class PrincipalCache:
+    """Bounded LRU of verified tokens to their Principal.
+    
+    Entries expire after PRINCIPAL_CACHE_TTL or when the token itself expires,
+    whichever comes first, and are dropped as soon as the user row changes.
+    The cache is per process, so other workers see a change after at most the TTL.
+    """
+    
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if not entry:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.time():
+                self._remove(digest)
+                return None
+            self._entries.move_to_end(digest)
+            return principal
+    
+    def put(self, digest, principal, token_expires_at):
+        with self._lock:
+            self._remove(digest)
+            self._entries[digest] = (min(time.time() + self.ttl, token_expires_at), principal)
+            self._by_user.setdefault(principal.id, set()).add(digest)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+    
+    def invalidate_user(self, user_id):
+        """Drop every cached token of a user"""
+        with self._lock:
+            for digest in list(self._by_user.get(user_id, ())):
+                self._remove(digest)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+    
+    def _remove(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry:
+            digests = self._by_user.get(entry[1].id)
+            if digests:
+                digests.discard(digest)
+                if not digests:
+                    del self._by_user[entry[1].id]
+
+principal_cache = PrincipalCache(Config.PRINCIPAL_CACHE_TTL, Config.PRINCIPAL_CACHE_SIZE)
+
+_PRINCIPAL_FIELDS = ('username', 'email', 'role', 'is_active', 'password_hash')
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    """Invalidate cached principals of users whose row changed in this flush"""
+    changed = session.info.setdefault('changed_user_ids', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = db.inspect(obj)
+        if obj in session.deleted or any(state.attrs[field].history.has_changes() for field in _PRINCIPAL_FIELDS):
+            changed.add(obj.id)
+            principal_cache.invalidate_user(obj.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_users(session):
+    # Invalidate again so a request that cached the old row mid-transaction is dropped
+    for user_id in session.info.pop('changed_user_ids', ()):
+        principal_cache.invalidate_user(user_id)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('changed_user_ids', None)
+
+def _authenticate(token):
+    """Resolve a bearer token to a Principal, returns (principal, error response)"""
+    if not token:
+        current_app.logger.warning('Token is missing in request')
+        return None, (jsonify({'message': 'Token is missing!'}), 401)
+    
+    try:
+        # Remove 'Bearer ' prefix if present
+        if token.startswith('Bearer '):
+            token = token[7:]
+        
+        digest = PrincipalCache.digest(token)
+        current_user = principal_cache.get(digest)
+        
+        if current_user is None:
             current_app.logger.info(f'Decoding token: {token[:20]}...')
             data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
-            current_user = User.query.filter_by(id=data['id']).first()
+            user = User.query.filter_by(id=data['id']).first()
             
-            if not current_user or not current_user.is_active:
+            if not user or not user.is_active:
                 current_app.logger.warning(f'User not found or inactive: {data.get("id")}')
-                return jsonify({'message': 'User not found or inactive!'}), 401
-                
-        except jwt.ExpiredSignatureError:
-            current_app.logger.warning('Token has expired')
-            return jsonify({'message': 'Token has expired!'}), 401
-        except jwt.InvalidTokenError as e:
-            current_app.logger.warning(f'Invalid token: {str(e)}')
-            return jsonify({'message': 'Token is invalid!'}), 401
-        except Exception as e:
-            current_app.logger.error(f'Token verification failed: {str(e)}')
-            return jsonify({'message': 'Token verification failed!'}), 401
+                return None, (jsonify({'message': 'User not found or inactive!'}), 401)
+            
+            current_user = Principal(user)
+            principal_cache.put(digest, current_user, data['exp'])
+        
+        return current_user, None
+        
+    except jwt.ExpiredSignatureError:
+        current_app.logger.warning('Token has expired')
+        return None, (jsonify({'message': 'Token has expired!'}), 401)
+    except jwt.InvalidTokenError as e:
+        current_app.logger.warning(f'Invalid token: {str(e)}')
+        return None, (jsonify({'message': 'Token is invalid!'}), 401)
+    except Exception as e:
+        current_app.logger.error(f'Token verification failed: {str(e)}')
+        return None, (jsonify({'message': 'Token verification failed!'}), 401)
 
+def token_required(f):
+    """Decorator to require authentication token"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        current_user, error = _authenticate(request.headers.get('Authorization'))
+        if error:
+            return error
+        return f(current_user, *args, **kwargs)
+    return decorated
+
+def issue_stream_ticket(user_id):
+    """Create a single-use ticket for /api/stream, valid for STREAM_TICKET_TTL seconds"""
+    now = datetime.utcnow()
+    ticket = secrets.token_urlsafe(32)
+    StreamTicket.query.filter(StreamTicket.expires_at <= now).delete(synchronize_session=False)
+    db.session.add(StreamTicket(
+        id=PrincipalCache.digest(ticket),
+        user_id=user_id,
+        expires_at=now + timedelta(seconds=Config.STREAM_TICKET_TTL)
+    ))
+    db.session.commit()
+    return ticket
+
+def _redeem_stream_ticket(ticket):
+    """Resolve a stream ticket to a Principal and use it up, returns (principal, error response)"""
+    digest = PrincipalCache.digest(ticket)
+    row = db.session.query(StreamTicket.user_id).filter(
+        StreamTicket.id == digest,
+        StreamTicket.expires_at > datetime.utcnow()
+    ).first()
+    # The conditional DELETE lets only one request redeem it, even across processes
+    redeemed = row and StreamTicket.query.filter_by(id=digest).delete(synchronize_session=False)
+    db.session.commit()
+    if not redeemed:
+        current_app.logger.warning('Stream ticket is invalid, expired or already used')
+        return None, (jsonify({'message': 'Stream ticket is invalid or expired!'}), 401)
+    
+    user = db.session.get(User, row.user_id)
+    if not user or not user.is_active:
+        return None, (jsonify({'message': 'User not found or inactive!'}), 401)
+    return Principal(user), None
+
+def stream_ticket_required(f):
+    """Like token_required, also accepting a ?ticket= from issue_stream_ticket.
+    
+    EventSource cannot set headers, and a session token in the URL would end up in
+    access logs, so browsers trade it for a short-lived single-use ticket instead.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        ticket = request.args.get('ticket')
+        if ticket:
+            current_user, error = _redeem_stream_ticket(ticket)
+        else:
+            current_user, error = _authenticate(request.headers.get('Authorization'))
+        if error:
+            return error
         return f(current_user, *args, **kwargs)
     return decorated
 
@@ -50,17 +230,15 @@ def admin_required(f):
     return decorated
 
 def log_audit(user_id, action, details=None, ip_address=None, user_agent=None):
-    """Log user actions for audit trail"""
+    """Log user actions for audit trail, written in the background by audit_writer"""
     try:
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            details=details,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-        db.session.add(audit_log)
-        db.session.commit()
+        audit_writer.submit({
+            'user_id': user_id,
+            'action': action,
+            'details': details,
+            'ip_address': ip_address,
+            'user_agent': user_agent
+        })
     except Exception as e:
         current_app.logger.error(f"Failed to log audit: {str(e)}")
 
@@ -81,7 +259,7 @@ def register_user(username, email, password, role='user'):
             email=email,
             role=role
         )
-        new_user.set_password(password)
+        new_user.password_hash = password_hasher.hash(password)
         
         db.session.add(new_user)
         db.session.commit()
@@ -101,6 +279,9 @@ def register_user(username, email, password, role='user'):
             "user": new_user.to_dict()
         }
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return {"success": False, "message": f"Registration failed: {str(e)}"}
@@ -113,9 +294,14 @@ def authenticate_user(email, password):
         if not user or not user.is_active:
             return {"success": False, "message": "Invalid credentials!"}
         
-        if not user.check_password(password):
+        if not password_hasher.verify(user.password_hash, password):
             return {"success": False, "message": "Invalid credentials!"}
         
+        if password_hasher.needs_rehash(user.password_hash):
+            # Upgrade hashes made at an older cost while the plain password is at hand
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+        
         # Generate token
         token = user.generate_token()
         
@@ -135,7 +321,10 @@ def authenticate_user(email, password):
             "user": user.to_dict()
         }
         
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
+        db.session.rollback()
         return {"success": False, "message": f"Authentication failed: {str(e)}"}
 
 def get_user_by_id(user_id):
@@ -190,10 +379,10 @@ def change_password(user_id, old_password, new_password):
         if not user:
             return {"success": False, "message": "User not found!"}
         
-        if not user.check_password(old_password):
+        if not password_hasher.verify(user.password_hash, old_password):
             return {"success": False, "message": "Current password is incorrect!"}
         
-        user.set_password(new_password)
+        user.password_hash = password_hasher.hash(new_password)
         db.session.commit()
         
         # Log the password change
@@ -207,23 +396,54 @@ def change_password(user_id, old_password, new_password):
         
         return {"success": True, "message": "Password changed successfully!"}
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return {"success": False, "message": f"Password change failed: {str(e)}"}
 
-def get_audit_logs(user_id=None, limit=100):
-    """Get audit logs"""
+def filter_audit_logs(query, user_id=None, action=None, ip_address=None, created_from=None, created_to=None):
+    """Apply the audit log filters shared by the list and export endpoints"""
+    if user_id is not None:
+        query = query.filter(AuditLog.user_id == user_id)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if ip_address:
+        query = query.filter(AuditLog.ip_address == ip_address)
+    if created_from:
+        query = query.filter(AuditLog.created_at >= created_from)
+    if created_to:
+        query = query.filter(AuditLog.created_at < created_to)
+    return query
+
+def get_audit_logs(user_id=None, limit=100, action=None, ip_address=None, created_from=None,
+                   created_to=None, cursor=None, include_counts=False):
+    """Get audit logs, newest first, one page at a time"""
     try:
-        query = AuditLog.query
-        if user_id:
-            query = query.filter_by(user_id=user_id)
-        
-        logs = query.order_by(AuditLog.created_at.desc()).limit(limit).all()
+        filters = dict(
+            user_id=user_id,
+            action=action,
+            ip_address=ip_address,
+            created_from=created_from,
+            created_to=created_to
+        )
+        query = filter_audit_logs(column_query(AuditLog), **filters)
+        logs, next_cursor = keyset_page(query, AuditLog.created_at, AuditLog.id, cursor=cursor, limit=limit)
         
-        return {
+        result = {
             "success": True,
-            "logs": [log.to_dict() for log in logs]
+            "logs": row_dicts(logs),
+            "next_cursor": next_cursor
         }
         
+        if include_counts:
+            counts = filter_audit_logs(
+                db.session.query(AuditLog.action, db.func.count(AuditLog.id)), **filters
+            ).group_by(AuditLog.action).all()
+            result["action_counts"] = {action: count for action, count in counts}
+        
+        return result
+        
     except Exception as e:
         return {"success": False, "message": f"Error retrieving audit logs: {str(e)}"}
@@ -0,0 +1,92 @@
+"""Compare rows/s of the ORM + to_dict() list path with the column tuple + fast JSON path,
+and check that both write the same bytes, including for floats orjson formats differently.
+
+Run from the TranspareX-protocole directory:
+    python benchmarks/list_serialization.py [rows]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from models import db, User, Fund, Transaction
+import serializers
+
+# orjson and json format these floats differently, the output has to match anyway
+EDGE_AMOUNTS = (0.00001, 5e-6, 0.00009, 0.0001, 1e16, 1.5e-12)
+
+def build_app(rows, amounts=None):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@example.com', password_hash='x'))
+        db.session.add(Fund(name='bench', total_amount=rows, remaining_amount=rows, created_by=1))
+        db.session.commit()
+        start = datetime(2024, 1, 1)
+        db.session.execute(Transaction.__table__.insert(), [{
+            'fund_id': 1,
+            'user_id': 1,
+            'recipient_address': '0x' + '22' * 20,
+            'amount': amounts[i % len(amounts)] if amounts else 0.5 + i % 10,
+            'status': 'completed',
+            'transaction_hash': '0x%064x' % i,
+            'block_number': i,
+            'gas_used': 42000,
+            'created_at': start + timedelta(seconds=i),
+            'completed_at': start + timedelta(seconds=i, microseconds=500),
+            # Non-ASCII text has to come out escaped, as jsonify writes it
+            'batch_id': 'lot-Café-ünïcode-😀' if i == 0 else None
+        } for i in range(rows)])
+        db.session.commit()
+    return app
+
+def orm_path():
+    transactions = Transaction.query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).all()
+    return jsonify({"success": True, "transactions": [tx.to_dict() for tx in transactions]}).get_data()
+
+def column_path():
+    rows = serializers.column_query(Transaction).order_by(Transaction.created_at.desc(), Transaction.id.desc()).all()
+    return serializers.json_response({"success": True, "transactions": serializers.row_dicts(rows)}).get_data()
+
+def measure(app, path, rows, repeat=5):
+    best = None
+    with app.test_request_context():
+        for _ in range(repeat):
+            db.session.expunge_all()
+            start = time.perf_counter()
+            body = path()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    return rows / best, body
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = build_app(rows)
+    
+    orm_rate, orm_body = measure(app, orm_path, rows)
+    results = [('ORM + to_dict() + jsonify', orm_rate, orm_body)]
+    
+    encoder = serializers.orjson
+    if encoder:
+        results.append(('column tuples + orjson', *measure(app, column_path, rows)))
+    serializers.orjson = None
+    results.append(('column tuples + json', *measure(app, column_path, rows)))
+    serializers.orjson = encoder
+    
+    print(f"{rows} transactions, best of 5")
+    for name, rate, body in results:
+        same = 'same output' if body == orm_body else 'DIFFERENT output'
+        print(f"  {name:<28} {rate:>12,.0f} rows/s  ({rate / orm_rate:.1f}x, {same})")
+    
+    edge_app = build_app(len(EDGE_AMOUNTS), EDGE_AMOUNTS)
+    with edge_app.test_request_context():
+        same = column_path() == orm_path()
+    print(f"amounts {', '.join(map(repr, EDGE_AMOUNTS))}: {'same output' if same else 'DIFFERENT output'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Offline load test of the API with a seeded database and a stub JSON-RPC node.
+
+Run from the TranspareX-protocole directory:
+    python benchmarks/loadtest.py --duration 30 --concurrency 16 --output report.json
+
+The app is served in-process by a threaded werkzeug server on a temporary SQLite
+database unless --url points at a running server (which must then be seeded and
+connected to a node already). The JSON report gives throughput and p50/p95/p99
+latency per endpoint, so that two runs can be compared.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from stub_node import StubNode
+
+DEFAULT_MIX = 'login=1,list_funds=4,list_transactions=4,create_transaction=2,dashboard=6'
+PASSWORD = 'loadtest-password'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=20, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of unmeasured load first')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='operation weights, name=weight,...')
+    parser.add_argument('--users', type=int, default=20, help='seeded regular users')
+    parser.add_argument('--funds', type=int, default=10, help='seeded funds')
+    parser.add_argument('--transactions', type=int, default=20000, help='seeded transactions')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the workload')
+    parser.add_argument('--url', help='base URL of a running server instead of the in-process one')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    return parser.parse_args()
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name}, expected one of {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def start_local_server(args):
+    """Seed a temporary database and serve the app on a free port, returns its base URL"""
+    node_url = StubNode().start()
+    database = os.path.join(tempfile.mkdtemp(prefix='transparex-loadtest-'), 'loadtest.db')
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{database}',
+        'GANACHE_URL': node_url,
+        'EVENT_INDEXER_ENABLED': 'false'
+    })
+    
+    import logging
+    logging.disable(logging.INFO)
+    
+    from werkzeug.serving import make_server
+    from app import app, init_database
+    from models import db, User, Fund, Transaction
+    
+    with app.app_context():
+        init_database()
+        template = User(username='template', email='template@example.com')
+        template.set_password(PASSWORD)
+        db.session.execute(User.__table__.insert(), [{
+            'username': f'user{i}', 'email': f'user{i}@loadtest.local', 'password_hash': template.password_hash,
+            'role': 'user', 'is_active': True, 'created_at': datetime.utcnow()
+        } for i in range(args.users)])
+        for i in range(args.funds):
+            db.session.add(Fund(name=f'Fund {i}', total_amount=10 ** 9, remaining_amount=10 ** 9, created_by=1))
+        db.session.commit()
+        
+        user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+        start = datetime.utcnow() - timedelta(days=30)
+        rng = random.Random(args.seed)
+        db.session.execute(Transaction.__table__.insert(), [{
+            'fund_id': rng.randint(1, args.funds),
+            'user_id': rng.choice(user_ids),
+            'recipient_address': '0x' + '22' * 20,
+            'amount': rng.randint(1, 100) / 10,
+            'status': 'completed',
+            'transaction_hash': '0x%064x' % i,
+            'created_at': start + timedelta(seconds=i),
+            'completed_at': start + timedelta(seconds=i)
+        } for i in range(args.transactions)])
+        db.session.commit()
+        
+        from stats_service import rebuild_stats
+        rebuild_stats()
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+class Client:
+    """One simulated dashboard user with its own keep-alive session"""
+    
+    def __init__(self, base_url, index, args):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.email = f'user{index % args.users}@loadtest.local'
+        self.funds = args.funds
+        self.token = None
+    
+    def request(self, method, path, **kwargs):
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token else {}
+        return self.session.request(method, self.base_url + path, headers=headers, timeout=30, **kwargs)
+    
+    def login(self):
+        response = self.request('POST', '/api/login', json={'email': self.email, 'password': PASSWORD})
+        if response.status_code == 200:
+            self.token = response.json()['token']
+        return response
+
+def op_login(client):
+    return client.login()
+
+def op_list_funds(client):
+    return client.request('GET', '/api/funds')
+
+def op_list_transactions(client):
+    return client.request('GET', '/api/transactions?limit=50')
+
+def op_create_transaction(client):
+    return client.request('POST', '/api/transactions', json={
+        'fund_id': client.rng.randint(1, client.funds),
+        'recipient_address': '0x' + '33' * 20,
+        'amount': 0.01
+    })
+
+def op_dashboard(client):
+    return client.request('GET', '/api/dashboard/stats')
+
+OPERATIONS = {
+    'login': op_login,
+    'list_funds': op_list_funds,
+    'list_transactions': op_list_transactions,
+    'create_transaction': op_create_transaction,
+    'dashboard': op_dashboard
+}
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def run(base_url, args, weights):
+    names = list(weights)
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    
+    measure_from = time.monotonic() + args.warmup
+    stop_at = measure_from + args.duration
+    
+    def worker(index):
+        client = Client(base_url, index, args)
+        client.login()
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                return
+            name = client.rng.choices(names, [weights[n] for n in names])[0]
+            start = time.perf_counter()
+            try:
+                status = OPERATIONS[name](client).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = time.perf_counter() - start
+            if now < measure_from:
+                continue
+            with lock:
+                latencies[name].append(elapsed)
+                if status is None:
+                    errors[name] += 1
+                else:
+                    statuses[name][str(status)] += 1
+                    if status >= 500:
+                        errors[name] += 1
+    
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    return latencies, statuses, errors
+
+def summarize(latencies, statuses, errors, duration, names):
+    def stats(values, count_errors, codes):
+        values = sorted(values)
+        return {
+            "requests": len(values),
+            "errors": count_errors,
+            "throughput_rps": round(len(values) / duration, 2),
+            "p50_ms": round(1000 * percentile(values, 0.50), 3) if values else None,
+            "p95_ms": round(1000 * percentile(values, 0.95), 3) if values else None,
+            "p99_ms": round(1000 * percentile(values, 0.99), 3) if values else None,
+            "max_ms": round(1000 * values[-1], 3) if values else None,
+            "status_codes": dict(codes)
+        }
+    
+    endpoints = {name: stats(latencies[name], errors[name], statuses[name]) for name in names}
+    all_codes = defaultdict(int)
+    for codes in statuses.values():
+        for code, count in codes.items():
+            all_codes[code] += count
+    total = stats([value for values in latencies.values() for value in values], sum(errors.values()), all_codes)
+    return endpoints, total
+
+def main():
+    args = parse_args()
+    weights = parse_mix(args.mix)
+    base_url = args.url.rstrip('/') if args.url else start_local_server(args)
+    
+    started_at = datetime.utcnow()
+    latencies, statuses, errors = run(base_url, args, weights)
+    endpoints, total = summarize(latencies, statuses, errors, args.duration, list(weights))
+    
+    report = {
+        "started_at": started_at.isoformat(),
+        "config": {
+            "url": args.url,
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "mix": weights,
+            "users": args.users,
+            "funds": args.funds,
+            "transactions": args.transactions,
+            "seed": args.seed
+        },
+        "endpoints": endpoints,
+        "total": total
+    }
+    
+    print(f"{'endpoint':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}", file=sys.stderr)
+    for name, row in list(endpoints.items()) + [('total', total)]:
+        print(f"{name:<20} {row['throughput_rps']:>9} {str(row['p50_ms']):>9} {str(row['p95_ms']):>9} "
+              f"{str(row['p99_ms']):>9} {row['errors']:>7}", file=sys.stderr)
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Measure how long importing the app takes once its libraries are loaded.
+
+Run from the TranspareX-protocole directory:
+    python benchmarks/startup.py [runs]
+
+Each run is a fresh interpreter that first imports Flask and SQLAlchemy (their cost
+does not depend on this code), then times `import app`, which builds the application.
+web3 and eth_account are not preloaded: the app must not import them until the first
+blockchain call, so the run fails if they are loaded. The node URL points at an
+unroutable address and the database file does not exist, so any RPC or database
+access during import shows up as a hang, a timeout or a created file. The target is
+a median under 150 ms.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MS = 150
+DEFERRED_MODULES = ('web3', 'eth_account', 'multiprocessing')
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, %r)
+import flask, flask_cors, flask_sqlalchemy, sqlalchemy, jwt
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({"import_ms": 1000 * elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+def run_once(database):
+    env = dict(os.environ,
+               DATABASE_URL=f'sqlite:///{database}',
+               GANACHE_URL='http://10.255.255.1:8545',
+               EVENT_INDEXER_ENABLED='true',
+               DISBURSEMENT_WORKERS_ENABLED='true')
+    result = subprocess.run([sys.executable, '-c', PROBE % (ROOT, DEFERRED_MODULES)], env=env, cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    database = os.path.join(tempfile.mkdtemp(prefix='transparex-startup-'), 'startup.db')
+    
+    results = [run_once(database) for _ in range(runs)]
+    timings = [result["import_ms"] for result in results]
+    median = statistics.median(timings)
+    touched = os.path.exists(database)
+    loaded = sorted({name for result in results for name in result["loaded"]})
+    
+    print(f"import app: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms over {runs} runs")
+    print(f"database opened during import: {'yes' if touched else 'no'}")
+    print(f"deferred modules loaded during import: {', '.join(loaded) or 'none'}")
+    if touched or loaded or median > TARGET_MS:
+        print(f"FAIL: expected no database access, none of {', '.join(DEFERRED_MODULES)} and a median under {TARGET_MS} ms")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Minimal in-process JSON-RPC node, enough for the app to start, read and release funds offline"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from eth_abi import encode
+from eth_utils import keccak
+
+class StubNode:
+    """Answers the JSON-RPC methods the app uses with fixed, plausible values"""
+    
+    def __init__(self, block=100, balance_eth=1000):
+        self.block = block
+        self.balance_wei = balance_eth * 10 ** 18
+        self.nonce = 0
+        self.signed = 0
+        self.receipts = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+    
+    def handle(self, request):
+        method = request.get("method")
+        params = request.get("params", [])
+        with self._lock:
+            self.requests += 1
+            
+            if method == "eth_blockNumber":
+                result = hex(self.block)
+            elif method == "eth_chainId":
+                result = "0x539"
+            elif method == "net_version":
+                result = "1337"
+            elif method == "web3_clientVersion":
+                result = "stub-node"
+            elif method == "eth_gasPrice":
+                result = hex(20 * 10 ** 9)
+            elif method == "eth_accounts":
+                result = ["0x" + "11" * 20]
+            elif method == "eth_getTransactionCount":
+                result = hex(self.nonce)
+            elif method == "eth_estimateGas":
+                result = hex(50000)
+            elif method == "eth_call":
+                result = "0x" + encode(["uint256"], [self.balance_wei]).hex()
+            elif method == "eth_getLogs":
+                result = []
+            elif method == "eth_getBlockByNumber":
+                result = {
+                    "number": hex(self.block), "hash": "0x" + "00" * 32, "baseFeePerGas": "0x1",
+                    "gasLimit": hex(30000000), "timestamp": "0x1", "transactions": []
+                }
+            elif method == "eth_signTransaction":
+                # Opaque but unique bytes, the app only hashes and re-sends them
+                self.signed += 1
+                result = "0x%064x" % self.signed
+            elif method == "eth_sendRawTransaction":
+                tx_hash = "0x" + keccak(hexstr=params[0]).hex()
+                if tx_hash not in self.receipts:
+                    self.nonce += 1
+                    self.block += 1
+                    self.receipts[tx_hash] = self.block
+                result = tx_hash
+            elif method == "eth_sendTransaction":
+                self.nonce += 1
+                self.block += 1
+                tx_hash = "0x%064x" % self.nonce
+                self.receipts[tx_hash] = self.block
+                result = tx_hash
+            elif method == "eth_getTransactionByHash":
+                block = self.receipts.get(params[0])
+                result = None if block is None else {
+                    "hash": params[0], "blockNumber": hex(block), "blockHash": "0x" + "00" * 32,
+                    "transactionIndex": "0x0", "from": "0x" + "11" * 20, "to": "0x" + "22" * 20,
+                    "value": "0x0", "gas": hex(50000), "gasPrice": hex(20 * 10 ** 9), "nonce": "0x0",
+                    "input": "0x", "v": "0x0", "r": "0x0", "s": "0x0", "type": "0x0"
+                }
+            elif method == "eth_getTransactionReceipt":
+                block = self.receipts.get(params[0])
+                result = None if block is None else {
+                    "transactionHash": params[0], "blockNumber": hex(block), "blockHash": "0x" + "00" * 32,
+                    "transactionIndex": "0x0", "from": "0x" + "11" * 20, "to": "0x" + "22" * 20,
+                    "gasUsed": hex(42000), "cumulativeGasUsed": hex(42000), "effectiveGasPrice": "0x1",
+                    "status": "0x1", "logs": [], "logsBloom": "0x" + "00" * 256, "contractAddress": None, "type": "0x0"
+                }
+            else:
+                return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": f"Method {method} not supported"}}
+        
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+    
+    def start(self, port=0):
+        """Serve on 127.0.0.1 in a daemon thread, returns the node URL"""
+        node = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                reply = [node.handle(item) for item in body] if isinstance(body, list) else node.handle(body)
+                data = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='stub-node', daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+    
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
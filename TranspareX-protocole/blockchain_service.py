@@ -1,6 +1,12 @@
 import json
-from web3 import Web3
+import threading
+from collections.abc import Mapping
 from config import Config
+from rpc_cache import TTLCache
+from nonce_manager import NonceAllocator
+from chain_heartbeat import ChainHeartbeat
+from metrics import metrics
+import time
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -8,11 +14,81 @@ logger = logging.getLogger(__name__)
 
 class BlockchainService:
     def __init__(self):
-        self.web3 = Web3(Web3.HTTPProvider(Config.GANACHE_URL))
         self.contract_address = Config.CONTRACT_ADDRESS
         self.abi = self._get_contract_abi()
+        self._selectors = {}
         self.contract = None
-        self._initialize_contract()
+        self.view_cache = TTLCache(Config.RPC_CACHE_TTL, Config.RPC_CACHE_MAX_ENTRIES)
+        self._client = None  # (web3, nonce allocator, local signer), built by _get_client
+        self._client_lock = threading.Lock()
+        self._chain_id = None
+        self._default_account = None
+        # No RPC here, the first probe (on first use or from the heartbeat thread)
+        # connects and initializes the contract when the node is reachable
+        self.heartbeat = ChainHeartbeat(self, Config.CHAIN_HEARTBEAT_INTERVAL)
+    
+    @property
+    def web3(self):
+        return self._get_client()[0]
+    
+    @property
+    def nonces(self):
+        return self._get_client()[1]
+    
+    @property
+    def signer(self):
+        return self._get_client()[2]
+    
+    def _get_client(self):
+        client = self._client
+        if client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+                client = self._client
+        return client
+    
+    def _create_client(self):
+        """Build the web3 client on first use, importing web3 and eth_account takes longer than the rest of the app"""
+        from web3 import Web3
+        from eth_account import Account
+        from rpc_provider import PooledHTTPProvider
+        
+        web3 = Web3(PooledHTTPProvider(
+            Config.GANACHE_URL,
+            pool_size=Config.RPC_POOL_SIZE,
+            connect_timeout=Config.RPC_CONNECT_TIMEOUT,
+            read_timeout=Config.RPC_READ_TIMEOUT,
+            max_retries=Config.RPC_MAX_RETRIES,
+            retry_backoff=Config.RPC_RETRY_BACKOFF
+        ))
+        self._selectors = {
+            Web3.keccak(text=f"{item['name']}({','.join(arg['type'] for arg in item['inputs'])})")[:4].hex(): item['name']
+            for item in self.abi if item.get('type') == 'function'
+        }
+        web3.middleware_onion.add(metrics.rpc_middleware(self._rpc_label), 'metrics')
+        signer = Account.from_key(Config.SENDER_PRIVATE_KEY) if Config.SENDER_PRIVATE_KEY else None
+        return web3, NonceAllocator(web3), signer
+    
+    def after_fork(self):
+        """Drop connections and node state inherited from a parent process"""
+        # The next use builds a new client with its own connection pool
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.contract = None
+        self.view_cache = TTLCache(Config.RPC_CACHE_TTL, Config.RPC_CACHE_MAX_ENTRIES)
+        self._chain_id = None
+        self._default_account = None
+        self.heartbeat = ChainHeartbeat(self, Config.CHAIN_HEARTBEAT_INTERVAL)
+    
+    def _rpc_label(self, method, params):
+        """Name eth_call by contract function, so metrics show which view call is slow"""
+        if method == 'eth_call' and params and isinstance(params[0], dict):
+            data = params[0].get('data') or ''
+            name = self._selectors.get(data[:10])
+            if name:
+                return f'eth_call:{name}'
+        return method
     
     def _get_contract_abi(self):
         """Contract ABI - in production, this should be loaded from a file"""
@@ -27,6 +103,16 @@ class BlockchainService:
                 "stateMutability": "nonpayable",
                 "type": "function"
             },
+            {
+                "inputs": [
+                    {"internalType": "address payable[]", "name": "recipients", "type": "address[]"},
+                    {"internalType": "uint256[]", "name": "amounts", "type": "uint256[]"}
+                ],
+                "name": "releaseFundsBatch",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
             {
                 "anonymous": False,
                 "inputs": [
@@ -53,24 +139,44 @@ class BlockchainService:
         ]
     
     def _initialize_contract(self):
-        """Initialize the contract instance"""
+        """Initialize the contract instance, called by the heartbeat once the node is reachable"""
         try:
-            if self.web3.is_connected():
-                self.contract = self.web3.eth.contract(
-                    address=self.contract_address,
-                    abi=self.abi
-                )
-                logger.info("Successfully connected to blockchain and initialized contract")
-            else:
-                logger.error("Failed to connect to blockchain")
-                self.contract = None
+            self.contract = self.web3.eth.contract(
+                address=self.contract_address,
+                abi=self.abi
+            )
+            logger.info("Successfully connected to blockchain and initialized contract")
         except Exception as e:
             logger.error(f"Error initializing contract: {str(e)}")
             self.contract = None
     
+    @staticmethod
+    def normalize_address(address):
+        """Return the checksummed form of an address, or None if it is invalid"""
+        from web3 import Web3
+        if not isinstance(address, str) or not Web3.is_address(address):
+            return None
+        return Web3.to_checksum_address(address)
+    
     def is_connected(self):
-        """Check if connected to blockchain"""
-        return self.web3.is_connected() and self.contract is not None
+        """Check if connected to blockchain, from the heartbeat state"""
+        self.heartbeat.ensure_fresh()
+        return self.heartbeat.connected and self.contract is not None
+    
+    def get_latest_block(self):
+        """Latest block number seen by the heartbeat"""
+        self.heartbeat.ensure_fresh()
+        if not self.heartbeat.connected:
+            raise ConnectionError(f"Blockchain node unreachable: {self.heartbeat.last_error}")
+        return self.heartbeat.latest_block
+    
+    def _cached_view(self, name, args, call):
+        """Run a view call through the TTL cache, keyed by the latest block number.
+        
+        call receives the block number so the result is read at exactly that block.
+        """
+        block_number = self.get_latest_block()
+        return self.view_cache.get_or_load((name, args, block_number), lambda: call(block_number))
     
     def get_contract_balance(self):
         """Get the balance of the smart contract"""
@@ -78,7 +184,10 @@ class BlockchainService:
             if not self.is_connected():
                 return None
             
-            balance_wei = self.contract.functions.getContractBalance().call()
+            balance_wei = self._cached_view(
+                'getContractBalance', (),
+                lambda block: self.contract.functions.getContractBalance().call(block_identifier=block)
+            )
             balance_eth = self.web3.from_wei(balance_wei, 'ether')
             return float(balance_eth)
         except Exception as e:
@@ -91,15 +200,81 @@ class BlockchainService:
             if not self.is_connected():
                 return None
             
-            balance_wei = self.contract.functions.getBalance(address).call()
+            balance_wei = self._cached_view(
+                'getBalance', (address,),
+                lambda block: self.contract.functions.getBalance(address).call(block_identifier=block)
+            )
             balance_eth = self.web3.from_wei(balance_wei, 'ether')
             return float(balance_eth)
         except Exception as e:
             logger.error(f"Error getting account balance: {str(e)}")
             return None
     
-    def release_funds(self, recipient_address, amount_eth, from_account=None):
-        """Release funds to a recipient address"""
+    def _get_chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.web3.eth.chain_id
+        return self._chain_id
+    
+    def _get_sender(self, from_account=None):
+        """Account that pays for and signs disbursements"""
+        if self.signer:
+            return self.signer.address
+        if from_account:
+            return from_account
+        if self._default_account is None:
+            accounts = self.web3.eth.accounts
+            if not accounts:
+                return None
+            self._default_account = accounts[0]
+        return self._default_account
+    
+    def _sign(self, transaction):
+        """Sign locally when a key is configured, otherwise let the node sign"""
+        if self.signer:
+            return self.signer.sign_transaction(transaction).rawTransaction
+        
+        # Sent without web3's result formatter: Geth answers {raw, tx}, Ganache only the raw bytes
+        signed = self.web3.manager.request_blocking('eth_signTransaction', [{
+            key: hex(value) if isinstance(value, int) else value for key, value in transaction.items()
+        }])
+        from hexbytes import HexBytes
+        return HexBytes(signed['raw'] if isinstance(signed, Mapping) else signed)
+    
+    def _prepare(self, contract_function, gas, from_account=None):
+        """Build and sign a contract call without broadcasting it"""
+        sender = self._get_sender(from_account)
+        if not sender:
+            raise ValueError("No accounts available")
+        
+        nonce = self.nonces.allocate(sender)
+        try:
+            transaction = contract_function.build_transaction({
+                'from': sender,
+                'gas': gas,
+                'gasPrice': self.view_cache.get_or_load(('gas_price',), lambda: self.web3.eth.gas_price),
+                'nonce': nonce,
+                'chainId': self._get_chain_id()
+            })
+            raw_transaction = self._sign(transaction)
+        except Exception:
+            # Nothing was broadcast, the nonce can be reused
+            self.nonces.release(sender, nonce)
+            raise
+        
+        return {
+            "success": True,
+            "raw_transaction": raw_transaction.hex(),
+            "transaction_hash": self.web3.keccak(raw_transaction).hex(),
+            "nonce": nonce,
+            "sender": sender
+        }
+    
+    def release_nonce(self, sender, nonce):
+        """Give back the nonce of a signed transaction that will never be broadcast"""
+        self.nonces.release(sender, nonce)
+    
+    def sign_release(self, recipient_address, amount_eth, from_account=None):
+        """Sign a releaseFunds transaction, broadcast() sends it"""
         try:
             if not self.is_connected():
                 return {"success": False, "error": "Not connected to blockchain"}
@@ -107,84 +282,250 @@ class BlockchainService:
             # Convert ETH to Wei
             amount_wei = self.web3.to_wei(amount_eth, 'ether')
             
-            # Get the first account if none specified (for Ganache)
-            if not from_account:
-                accounts = self.web3.eth.accounts
-                if not accounts:
-                    return {"success": False, "error": "No accounts available"}
-                from_account = accounts[0]
-            
-            # Build transaction
-            transaction = self.contract.functions.releaseFunds(
-                recipient_address, amount_wei
-            ).build_transaction({
-                'from': from_account,
-                'gas': 200000,
-                'gasPrice': self.web3.eth.gas_price,
-                'nonce': self.web3.eth.get_transaction_count(from_account)
-            })
+            return self._prepare(
+                self.contract.functions.releaseFunds(recipient_address, amount_wei),
+                Config.TX_GAS_LIMIT,
+                from_account
+            )
             
-            # For demo purposes, we'll simulate the transaction
-            # In production, you would sign and send the transaction
-            logger.info(f"Simulating fund release: {amount_eth} ETH to {recipient_address}")
+        except Exception as e:
+            logger.error(f"Error signing release: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def batch_size(self):
+        """Recipients per releaseFundsBatch call, planned from the per-recipient gas budget"""
+        return max(1, (Config.TX_BATCH_GAS_LIMIT - Config.TX_BATCH_GAS_BASE) // Config.TX_BATCH_GAS_PER_RECIPIENT)
+    
+    def sign_release_batch(self, recipient_addresses, amounts_eth, from_account=None):
+        """Sign a releaseFundsBatch transaction paying several recipients, broadcast() sends it.
+        
+        The gas limit is the node's estimate plus TX_BATCH_GAS_HEADROOM. A batch whose
+        limit would exceed TX_BATCH_GAS_LIMIT is not signed and returns "too_large",
+        so the caller can split it.
+        """
+        try:
+            if not self.is_connected():
+                return {"success": False, "error": "Not connected to blockchain"}
             
-            return {
-                "success": True,
-                "transaction_hash": "0x" + "0" * 64,  # Simulated hash
-                "amount": amount_eth,
-                "recipient": recipient_address,
-                "message": f"Funds released successfully to {recipient_address}"
-            }
+            if len(recipient_addresses) > self.batch_size():
+                return {"success": False, "error": f"Batch exceeds {self.batch_size()} recipients"}
+            
+            sender = self._get_sender(from_account)
+            if not sender:
+                return {"success": False, "error": "No accounts available"}
+            
+            amounts_wei = [self.web3.to_wei(amount, 'ether') for amount in amounts_eth]
+            contract_function = self.contract.functions.releaseFundsBatch(recipient_addresses, amounts_wei)
+            # Estimated rather than computed, first-time payees cost far more than repeat ones
+            gas = int(contract_function.estimate_gas({'from': sender}) * Config.TX_BATCH_GAS_HEADROOM)
+            if gas > Config.TX_BATCH_GAS_LIMIT:
+                return {
+                    "success": False,
+                    "too_large": True,
+                    "error": f"Batch of {len(recipient_addresses)} recipients needs {gas} gas, over TX_BATCH_GAS_LIMIT"
+                }
+            
+            return self._prepare(contract_function, gas, from_account)
             
         except Exception as e:
-            logger.error(f"Error releasing funds: {str(e)}")
+            logger.error(f"Error signing batch release: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def _is_known(self, transaction_hash):
+        """True when the node has the transaction, pending or mined"""
+        from web3.exceptions import TransactionNotFound
+        try:
+            return self.web3.eth.get_transaction(transaction_hash) is not None
+        except TransactionNotFound:
+            return False
+    
+    def broadcast(self, raw_transaction, transaction_hash, sender):
+        """Send a signed transaction.
+        
+        On failure "rejected" tells whether the node definitely refused it; otherwise
+        the transaction may still have reached the node.
+        """
+        try:
+            if not self.is_connected():
+                return {"success": False, "error": "Not connected to blockchain"}
+            
+            self.web3.eth.send_raw_transaction(raw_transaction)
+            logger.info(f"Broadcast transaction {transaction_hash} from {sender}")
+            return {"success": True, "transaction_hash": transaction_hash}
+            
+        except Exception as e:
+            try:
+                # The node may have accepted the transaction before the call failed
+                if self._is_known(transaction_hash):
+                    return {"success": True, "transaction_hash": transaction_hash}
+                rejected = isinstance(e, ValueError)  # a JSON-RPC error answer
+            except Exception:
+                rejected = False
+            self.nonces.resync(sender)
+            logger.error(f"Error broadcasting transaction {transaction_hash}: {str(e)}")
+            return {"success": False, "error": str(e), "rejected": rejected}
+    
+    def resume(self, raw_transaction, transaction_hash, sender, nonce):
+        """Finish sending a transaction signed by an earlier attempt, never signing a new one.
+        
+        Succeeds when the node already has the transaction and broadcasts it again when it
+        does not. Returns "replaced" when its nonce went to another transaction, so it can
+        never be mined and a new one has to be signed.
+        """
+        try:
+            if not self.is_connected():
+                return {"success": False, "error": "Not connected to blockchain"}
+            
+            # Read the count first, so a transaction mined in between is still found below
+            nonce_used = self.web3.eth.get_transaction_count(sender, 'latest') > nonce
+            if self._is_known(transaction_hash):
+                return {"success": True, "transaction_hash": transaction_hash}
+            if nonce_used:
+                return {"success": False, "replaced": True, "error": f"Nonce {nonce} was used by another transaction"}
+            
+        except Exception as e:
+            logger.error(f"Error checking transaction {transaction_hash}: {str(e)}")
+            return {"success": False, "error": str(e)}
+        
+        return self.broadcast(raw_transaction, transaction_hash, sender)
+    
+    def fetch_fund_released_events(self, from_block, to_block):
+        """Fetch FundReleased events in a block range, raising on RPC errors"""
+        events = self.contract.events.FundReleased.get_logs(
+            fromBlock=from_block,
+            toBlock=to_block
+        )
+        
+        formatted_events = []
+        for event in events:
+            formatted_events.append({
+                "transaction_hash": event.transactionHash.hex(),
+                "recipient": event.args.recipient,
+                "amount": float(self.web3.from_wei(event.args.amount, 'ether')),
+                "block_number": event.blockNumber,
+                "log_index": event.logIndex
+            })
+        
+        return formatted_events
+    
     def get_fund_released_events(self, from_block=0, to_block='latest'):
         """Get all FundReleased events"""
         try:
             if not self.is_connected():
                 return []
             
-            events = self.contract.events.FundReleased.create_filter(
-                fromBlock=from_block,
-                toBlock=to_block
-            ).get_all_entries()
-            
-            formatted_events = []
-            for event in events:
-                formatted_events.append({
-                    "transaction_hash": event.transactionHash.hex(),
-                    "recipient": event.args.recipient,
-                    "amount": float(self.web3.from_wei(event.args.amount, 'ether')),
-                    "block_number": event.blockNumber,
-                    "log_index": event.logIndex
-                })
-            
-            return formatted_events
+            return self.fetch_fund_released_events(from_block, to_block)
             
         except Exception as e:
             logger.error(f"Error getting events: {str(e)}")
             return []
     
+    def _rpc_batch(self, calls):
+        """Send several read-only JSON-RPC calls in a single HTTP request.
+        
+        calls is a list of (method, params); returns one response dict per call,
+        in the same order, each holding either a "result" or an "error".
+        """
+        if not calls:
+            return []
+        
+        payload = [
+            {"jsonrpc": "2.0", "id": index, "method": method, "params": params}
+            for index, (method, params) in enumerate(calls)
+        ]
+        started = time.perf_counter()
+        try:
+            raw_response = self.web3.provider.post_raw(json.dumps(payload).encode(), 'batch')
+        except Exception:
+            metrics.record_rpc('batch', time.perf_counter() - started, error=True)
+            raise
+        metrics.record_rpc('batch', time.perf_counter() - started)
+        responses = json.loads(raw_response)
+        
+        if isinstance(responses, dict):
+            # The node rejected the batch as a whole
+            raise ValueError(responses.get("error", "Invalid batch response"))
+        
+        by_id = {response.get("id"): response for response in responses}
+        return [
+            by_id.get(index, {"error": {"message": "No response for request"}})
+            for index in range(len(calls))
+        ]
+    
+    def _format_transaction_details(self, transaction, receipt):
+        """Format raw eth_getTransactionByHash and eth_getTransactionReceipt results"""
+        return {
+            "transaction_hash": transaction["hash"],
+            "from": self.web3.to_checksum_address(transaction["from"]),
+            "to": self.web3.to_checksum_address(transaction["to"]) if transaction.get("to") else None,
+            "value": float(self.web3.from_wei(int(transaction["value"], 16), 'ether')),
+            "gas_used": int(receipt["gasUsed"], 16),
+            "block_number": int(receipt["blockNumber"], 16),
+            "status": "success" if int(receipt["status"], 16) == 1 else "failed"
+        }
+    
+    def get_transaction_details_batch(self, tx_hashes):
+        """Get details of several transactions with one JSON-RPC batch round trip.
+        
+        Returns one entry per hash, in order: {"transaction": {...}} when found,
+        otherwise {"error": "..."}.
+        """
+        calls = []
+        for tx_hash in tx_hashes:
+            calls.append(("eth_getTransactionByHash", [tx_hash]))
+            calls.append(("eth_getTransactionReceipt", [tx_hash]))
+        
+        responses = self._rpc_batch(calls)
+        
+        results = []
+        for index in range(len(tx_hashes)):
+            transaction, receipt = responses[2 * index], responses[2 * index + 1]
+            error = transaction.get("error") or receipt.get("error")
+            
+            if error:
+                results.append({"error": error.get("message", str(error)) if isinstance(error, dict) else str(error)})
+            elif not transaction.get("result"):
+                results.append({"error": "Transaction not found"})
+            elif not receipt.get("result"):
+                results.append({"error": "Transaction is pending"})
+            else:
+                try:
+                    results.append({"transaction": self._format_transaction_details(transaction["result"], receipt["result"])})
+                except (KeyError, TypeError, ValueError) as e:
+                    results.append({"error": f"Malformed node response: {str(e)}"})
+        
+        return results
+    
+    def get_transaction_receipts_batch(self, tx_hashes):
+        """Fetch the receipts of several transactions with one JSON-RPC batch round trip.
+        
+        Returns one entry per hash, in order: {"block_number", "gas_used", "success"}
+        once mined, None while pending. Raises if the node fails any of the lookups.
+        """
+        responses = self._rpc_batch([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes])
+        
+        receipts = []
+        for tx_hash, response in zip(tx_hashes, responses):
+            if response.get("error"):
+                raise ValueError(f"Receipt lookup failed for {tx_hash}: {response['error']}")
+            receipt = response.get("result")
+            if not receipt or not receipt.get("blockNumber"):
+                receipts.append(None)
+                continue
+            receipts.append({
+                "block_number": int(receipt["blockNumber"], 16),
+                "gas_used": int(receipt["gasUsed"], 16),
+                "success": int(receipt["status"], 16) == 1
+            })
+        return receipts
+    
     def get_transaction_details(self, tx_hash):
         """Get details of a specific transaction"""
         try:
             if not self.is_connected():
                 return None
             
-            transaction = self.web3.eth.get_transaction(tx_hash)
-            receipt = self.web3.eth.get_transaction_receipt(tx_hash)
-            
-            return {
-                "transaction_hash": transaction.hash.hex(),
-                "from": transaction['from'],
-                "to": transaction['to'],
-                "value": float(self.web3.from_wei(transaction.value, 'ether')),
-                "gas_used": receipt.gasUsed,
-                "block_number": receipt.blockNumber,
-                "status": "success" if receipt.status == 1 else "failed"
-            }
+            return self.get_transaction_details_batch([tx_hash])[0].get("transaction")
             
         except Exception as e:
             logger.error(f"Error getting transaction details: {str(e)}")
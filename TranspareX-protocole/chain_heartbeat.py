@@ -0,0 +1,97 @@
+import threading
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class ChainHeartbeat:
+    """Probes the node in the background and publishes the result.
+    
+    Each probe is a single eth_blockNumber call, which gives connectivity, the
+    latest block and the round trip latency at once. Service methods read the
+    published state instead of calling the node to check that it is up. When the
+    node comes back after an outage the contract is initialized again.
+    """
+    
+    def __init__(self, service, interval):
+        self.service = service
+        self.interval = interval
+        self.connected = False
+        self.latest_block = None
+        self.latency_ms = None
+        self.last_error = None
+        self.checked_at = None  # time.monotonic() of the last probe
+        self.checked_at_utc = None
+        self._probe_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+    
+    def start(self):
+        """Start the background probe thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='chain-heartbeat', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout=None):
+        """Stop the background probe thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.probe()
+            self._stop_event.wait(self.interval)
+    
+    def is_fresh(self):
+        """Whether the published state is recent enough to be trusted"""
+        return self.checked_at is not None and time.monotonic() - self.checked_at < 2 * self.interval
+    
+    def ensure_fresh(self):
+        """Probe synchronously when the background thread has not reported recently"""
+        if not self.is_fresh():
+            with self._probe_lock:
+                if not self.is_fresh():
+                    self._probe()
+    
+    def probe(self):
+        """Check the node once and update the published state"""
+        with self._probe_lock:
+            self._probe()
+    
+    def _probe(self):
+        was_connected = self.connected
+        start = time.perf_counter()
+        try:
+            self.latest_block = self.service.web3.eth.block_number
+            self.latency_ms = round(1000 * (time.perf_counter() - start), 3)
+            self.connected = True
+            self.last_error = None
+        except Exception as e:
+            self.connected = False
+            self.latency_ms = None
+            self.last_error = str(e)
+        
+        self.checked_at = time.monotonic()
+        self.checked_at_utc = datetime.utcnow()
+        
+        if self.connected and (not was_connected or self.service.contract is None):
+            logger.info(f"Blockchain node reachable at block {self.latest_block}")
+            self.service._initialize_contract()
+        elif was_connected and not self.connected:
+            logger.error(f"Lost connection to blockchain node: {self.last_error}")
+    
+    def snapshot(self):
+        """Get the published state for health reporting"""
+        return {
+            "connected": self.connected,
+            "latest_block": self.latest_block,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at_utc.isoformat() if self.checked_at_utc else None,
+            "error": self.last_error
+        }
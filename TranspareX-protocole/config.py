@@ -7,6 +7,7 @@ class Config:
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///transparex.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'true').lower() == 'true'  # apply pending migrations when run.py starts
     
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -18,3 +19,104 @@ class Config:
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 86400))  # 24 hours
+    
+    # Production Server Configuration (python run.py --production)
+    SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5000')
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', os.cpu_count() or 1))  # pre-forked processes, one per core
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 8))  # request threads per worker
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', 1000))  # recycle a worker after this many requests, 0 never
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', 100))  # spreads recycling of the workers
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', 60))  # seconds before a stuck worker is restarted
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))  # seconds to finish requests on shutdown
+    
+    # Password Hashing Configuration
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')  # werkzeug method and cost
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))  # 0 hashes inline
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', max(1, SERVER_THREADS // 2)))  # in-flight operations before 503, below the request threads
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))  # seconds to wait for a worker
+    
+    # Event Indexer Configuration
+    EVENT_INDEXER_ENABLED = os.getenv('EVENT_INDEXER_ENABLED', 'true').lower() == 'true'
+    EVENT_INDEXER_INTERVAL = float(os.getenv('EVENT_INDEXER_INTERVAL', 5))  # seconds between polls
+    EVENT_INDEXER_START_BLOCK = int(os.getenv('EVENT_INDEXER_START_BLOCK', 0))
+    EVENT_INDEXER_BATCH_BLOCKS = int(os.getenv('EVENT_INDEXER_BATCH_BLOCKS', 2000))  # blocks per eth_getLogs
+    EVENT_INDEXER_CONFIRMATIONS = int(os.getenv('EVENT_INDEXER_CONFIRMATIONS', 0))  # reorg safety margin
+    
+    # Confirmation Tracker Configuration
+    CONFIRMATION_TRACKER_ENABLED = os.getenv('CONFIRMATION_TRACKER_ENABLED', 'true').lower() == 'true'
+    CONFIRMATION_TRACKER_INTERVAL = float(os.getenv('CONFIRMATION_TRACKER_INTERVAL', 5))  # seconds between receipt polls
+    CONFIRMATION_DEPTH = int(os.getenv('CONFIRMATION_DEPTH', 1))  # blocks, counting its own, before a transaction is final
+    CONFIRMATION_BATCH_SIZE = int(os.getenv('CONFIRMATION_BATCH_SIZE', 100))  # receipts per JSON-RPC batch
+    CONFIRMATION_TIMEOUT = int(os.getenv('CONFIRMATION_TIMEOUT', 600))  # seconds without a receipt before the disbursement job re-checks the transaction
+    
+    # Pagination Configuration
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 500))
+    
+    # Event Stream Configuration
+    EVENT_STREAM_QUEUE_SIZE = int(os.getenv('EVENT_STREAM_QUEUE_SIZE', 256))  # undelivered messages per client
+    EVENT_STREAM_KEEPALIVE = float(os.getenv('EVENT_STREAM_KEEPALIVE', 15))  # seconds between keepalive comments
+    EVENT_STREAM_RETRY_MS = int(os.getenv('EVENT_STREAM_RETRY_MS', 3000))  # client reconnect delay
+    EVENT_STREAM_MAX_CLIENTS = int(os.getenv('EVENT_STREAM_MAX_CLIENTS', max(SERVER_THREADS // 2, 1)))  # open streams per process, each holds a request thread
+    STREAM_TICKET_TTL = int(os.getenv('STREAM_TICKET_TTL', 30))  # seconds a stream ticket can be redeemed
+    EVENT_STREAM_SYNC_INTERVAL = float(os.getenv('EVENT_STREAM_SYNC_INTERVAL', 2))  # seconds between checks for other processes' writes, 0 disables
+    
+    # Response Cache Configuration
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 300))  # seconds an unchanged body is kept
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    
+    # Export Configuration
+    EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', 1000))  # rows fetched per database round trip
+    EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', 65536))  # response chunk size
+    
+    # RPC Cache Configuration
+    RPC_CACHE_TTL = float(os.getenv('RPC_CACHE_TTL', 2))  # seconds a view call result is reused
+    RPC_CACHE_MAX_ENTRIES = int(os.getenv('RPC_CACHE_MAX_ENTRIES', 1024))
+    
+    # Principal Cache Configuration
+    PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', 60))  # seconds
+    PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 10000))
+    
+    # Disbursement Queue Configuration
+    DISBURSEMENT_WORKERS_ENABLED = os.getenv('DISBURSEMENT_WORKERS_ENABLED', 'true').lower() == 'true'
+    DISBURSEMENT_WORKERS = int(os.getenv('DISBURSEMENT_WORKERS', 2))  # worker threads per process
+    DISBURSEMENT_MAX_ATTEMPTS = int(os.getenv('DISBURSEMENT_MAX_ATTEMPTS', 5))
+    DISBURSEMENT_RETRY_BASE_DELAY = float(os.getenv('DISBURSEMENT_RETRY_BASE_DELAY', 2))  # seconds, doubled per attempt
+    DISBURSEMENT_RETRY_MAX_DELAY = float(os.getenv('DISBURSEMENT_RETRY_MAX_DELAY', 300))
+    DISBURSEMENT_POLL_INTERVAL = float(os.getenv('DISBURSEMENT_POLL_INTERVAL', 1))
+    DISBURSEMENT_LOCK_TIMEOUT = int(os.getenv('DISBURSEMENT_LOCK_TIMEOUT', 300))  # seconds before a running job is retaken
+    
+    # Transaction Sending Configuration
+    SENDER_PRIVATE_KEY = os.getenv('SENDER_PRIVATE_KEY')  # sign locally; otherwise use the node's first account
+    TX_GAS_LIMIT = int(os.getenv('TX_GAS_LIMIT', 200000))
+    
+    # Batch Disbursement Configuration
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 5000))  # items accepted per request
+    TX_BATCH_GAS_LIMIT = int(os.getenv('TX_BATCH_GAS_LIMIT', 6000000))  # gas limit of one releaseFundsBatch call
+    TX_BATCH_GAS_BASE = int(os.getenv('TX_BATCH_GAS_BASE', 60000))
+    # Sizes chunks at enqueue time. A first-time payee costs about 60k gas: a transfer to a
+    # cold, empty account (2600 + 9000 + 25000), a new fundsReleased slot (22100) and the log
+    TX_BATCH_GAS_PER_RECIPIENT = int(os.getenv('TX_BATCH_GAS_PER_RECIPIENT', 65000))
+    TX_BATCH_GAS_HEADROOM = float(os.getenv('TX_BATCH_GAS_HEADROOM', 1.2))  # multiplier on the node's gas estimate
+    
+    # Transaction Lookup Configuration
+    BLOCKCHAIN_BATCH_MAX_HASHES = int(os.getenv('BLOCKCHAIN_BATCH_MAX_HASHES', 100))  # hashes per lookup request
+    
+    # RPC Provider Configuration
+    # Keep-alive connections per process, one for each thread that can call the node:
+    # request threads, disbursement workers, and heartbeat, indexer and confirmation tracker
+    RPC_POOL_SIZE = int(os.getenv('RPC_POOL_SIZE', SERVER_THREADS + DISBURSEMENT_WORKERS + 3))
+    RPC_CONNECT_TIMEOUT = float(os.getenv('RPC_CONNECT_TIMEOUT', 3))  # seconds
+    RPC_READ_TIMEOUT = float(os.getenv('RPC_READ_TIMEOUT', 10))  # seconds
+    RPC_MAX_RETRIES = int(os.getenv('RPC_MAX_RETRIES', 2))  # extra attempts for idempotent reads
+    RPC_RETRY_BACKOFF = float(os.getenv('RPC_RETRY_BACKOFF', 0.1))  # seconds, doubled per retry
+    
+    # Chain Heartbeat Configuration
+    CHAIN_HEARTBEAT_INTERVAL = float(os.getenv('CHAIN_HEARTBEAT_INTERVAL', 5))  # seconds between node probes
+    
+    # Audit Log Configuration
+    AUDIT_SYNC = os.getenv('AUDIT_SYNC', 'false').lower() == 'true'  # write entries inline, e.g. for tests
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 500))  # flush when this many entries are buffered
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1))  # seconds, flush at least this often
+    AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH')  # file for entries that do not fit in the queue
@@ -0,0 +1,184 @@
+import threading
+import logging
+from datetime import datetime, timedelta
+from models import db, Transaction, DisbursementJob
+import fund_reservations
+from blockchain_service import blockchain_service
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ConfirmationTracker:
+    """Follows submitted disbursements until they are final.
+    
+    Each pass loads the submitted transactions, fetches their receipts in JSON-RPC
+    batches and stores block number and gas used. Once a receipt is CONFIRMATION_DEPTH
+    blocks deep the transaction becomes completed, or failed if it reverted, and its
+    fund reservation is settled or released. Status reads then come from the database,
+    and the RPC load follows the number of unconfirmed transactions.
+    
+    A transaction still without a receipt CONFIRMATION_TIMEOUT seconds after it was
+    broadcast may have been dropped or replaced. It goes back to pending and its
+    disbursement job is queued again. The job then finds it on the node, broadcasts it
+    again, or signs a new one if its nonce was taken. If the node refuses it, the job
+    fails and the hold is released.
+    """
+    
+    def __init__(self, service=None):
+        self.service = service or blockchain_service
+        self.app = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._sync_lock = threading.Lock()
+    
+    def init_app(self, app):
+        """Bind the tracker to a Flask application"""
+        self.app = app
+    
+    def start(self):
+        """Start the background tracking thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='confirmation-tracker', daemon=True)
+        self._thread.start()
+        logger.info("Confirmation tracker started")
+    
+    def stop(self, timeout=None):
+        """Stop the background tracking thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    self.sync_once()
+            except Exception as e:
+                logger.error(f"Confirmation tracker pass failed: {str(e)}")
+            self._stop_event.wait(Config.CONFIRMATION_TRACKER_INTERVAL)
+    
+    def sync_once(self):
+        """Check every submitted transaction once, returns the number made final"""
+        with self._sync_lock:
+            if not self.service.is_connected():
+                return 0
+            
+            head = self.service.get_latest_block()
+            finalized = 0
+            last_id = 0
+            while not self._stop_event.is_set():
+                transactions = Transaction.query.filter(
+                    Transaction.status == 'submitted',
+                    Transaction.id > last_id
+                ).order_by(Transaction.id).limit(Config.CONFIRMATION_BATCH_SIZE).all()
+                if not transactions:
+                    break
+                
+                last_id = transactions[-1].id
+                try:
+                    finalized += self._check(transactions, head)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+            
+            return finalized
+    
+    def _check(self, transactions, head):
+        """Record the receipts of a batch and finalize the transactions deep enough"""
+        # Transactions of one releaseFundsBatch call share a hash, and its receipt
+        hashes = sorted({tx.transaction_hash for tx in transactions})
+        receipts = dict(zip(hashes, self.service.get_transaction_receipts_batch(hashes)))
+        
+        completed, reverted, overdue = [], [], []
+        now = datetime.utcnow()
+        expired_before = now - timedelta(seconds=Config.CONFIRMATION_TIMEOUT)
+        for transaction in transactions:
+            receipt = receipts.get(transaction.transaction_hash)
+            if receipt is None:
+                # Not mined yet, or taken out of its block by a reorg
+                transaction.block_number = None
+                transaction.gas_used = None
+                if transaction.submitted_at is None:
+                    # Submitted before submission times were recorded, start its clock now
+                    transaction.submitted_at = now
+                elif transaction.submitted_at < expired_before:
+                    overdue.append(transaction)
+                continue
+            
+            transaction.block_number = receipt["block_number"]
+            transaction.gas_used = receipt["gas_used"]
+            if head - receipt["block_number"] + 1 < Config.CONFIRMATION_DEPTH:
+                continue
+            
+            status = 'completed' if receipt["success"] else 'failed'
+            claimed = Transaction.query.filter(
+                Transaction.id == transaction.id,
+                Transaction.status == 'submitted'
+            ).update({'status': status}, synchronize_session=False)
+            if not claimed:
+                # Finalized by a tracker in another process
+                continue
+            
+            # Set it on the object too, so the stats and event hooks see the change
+            transaction.status = status
+            if receipt["success"]:
+                transaction.completed_at = now
+                completed.append(transaction)
+            else:
+                logger.warning(f"Transaction {transaction.id} reverted in block {receipt['block_number']}")
+                reverted.append(transaction)
+        
+        for fund_id, amount in fund_reservations.totals_by_fund(completed).items():
+            fund_reservations.settle(fund_id, amount)
+        for fund_id, amount in fund_reservations.totals_by_fund(reverted).items():
+            fund_reservations.release(fund_id, amount)
+        
+        self._requeue(overdue, now)
+        return len(completed) + len(reverted)
+    
+    def _requeue(self, transactions, now):
+        """Hand transactions without a receipt back to their disbursement jobs, the hold stays in place"""
+        jobs = {}
+        for transaction in transactions:
+            key = ('batch_id', transaction.batch_id) if transaction.batch_id else ('transaction_id', transaction.id)
+            jobs.setdefault(key, []).append(transaction)
+        
+        for (column, value), members in jobs.items():
+            transaction_hash = members[0].transaction_hash
+            job_filter = getattr(DisbursementJob, column) == value
+            # Only a finished job is taken back, another tracker may have done it already
+            claimed = DisbursementJob.query.filter(job_filter, DisbursementJob.status == 'done').update({
+                'status': 'queued',
+                'run_at': now,
+                'last_error': f"No receipt after {Config.CONFIRMATION_TIMEOUT} seconds"
+            }, synchronize_session=False)
+            if not claimed:
+                if not DisbursementJob.query.filter(job_filter).first():
+                    logger.warning(f"Transaction {members[0].id} has no receipt and no disbursement job to re-check it")
+                continue
+            
+            if column == 'batch_id':
+                # The batch may span pages, move every transaction sent with this hash
+                members = Transaction.query.filter(
+                    Transaction.batch_id == value,
+                    Transaction.status == 'submitted',
+                    Transaction.transaction_hash == transaction_hash
+                ).all()
+            for transaction in members:
+                moved = Transaction.query.filter(
+                    Transaction.id == transaction.id,
+                    Transaction.status == 'submitted'
+                ).update({'status': 'pending'}, synchronize_session=False)
+                if moved:
+                    # Set it on the object too, so the stats and event hooks see the change
+                    transaction.status = 'pending'
+            logger.warning(f"Transaction {transaction_hash} has no receipt after "
+                           f"{Config.CONFIRMATION_TIMEOUT} seconds, re-checking it through its disbursement job")
+
+# Global instance
+confirmation_tracker = ConfirmationTracker()
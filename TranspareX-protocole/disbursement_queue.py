@@ -0,0 +1,241 @@
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from models import db, Transaction, DisbursementJob
+import fund_reservations
+from blockchain_service import blockchain_service
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class DisbursementQueue:
+    """Database-backed queue of on-chain fund releases.
+    
+    A job row is committed together with its pending transaction, so accepted
+    disbursements survive restarts. Workers claim jobs with a conditional UPDATE,
+    which lets any number of threads and processes share the same table. The signed
+    transaction is committed to the job before it is broadcast, and a retried job
+    checks or re-sends that transaction instead of signing a second payment.
+    """
+    
+    def __init__(self, service=None):
+        self.service = service or blockchain_service
+        self.app = None
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Condition()
+    
+    def init_app(self, app):
+        """Bind the queue to a Flask application"""
+        self.app = app
+    
+    def enqueue(self, transaction):
+        """Add a job for a transaction to the current session, the caller commits"""
+        job = DisbursementJob(transaction_id=transaction.id, status='queued', run_at=datetime.utcnow())
+        db.session.add(job)
+        return job
+    
+    def enqueue_batch(self, batch_id):
+        """Add a job releasing every transaction of a batch in one contract call"""
+        job = DisbursementJob(batch_id=batch_id, status='queued', run_at=datetime.utcnow())
+        db.session.add(job)
+        return job
+    
+    def notify(self):
+        """Wake idle workers after new jobs have been committed"""
+        with self._wakeup:
+            self._wakeup.notify_all()
+    
+    def start(self, workers=None):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        
+        self._stop_event.clear()
+        for index in range(workers or Config.DISBURSEMENT_WORKERS):
+            thread = threading.Thread(target=self._run, name=f'disbursement-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {len(self._threads)} disbursement workers")
+    
+    def stop(self, timeout=None):
+        """Stop the worker threads, letting running jobs finish"""
+        self._stop_event.set()
+        self.notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def _run(self):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+        while not self._stop_event.is_set():
+            processed = False
+            try:
+                with self.app.app_context():
+                    processed = self.process_next(worker_id)
+            except Exception as e:
+                logger.error(f"Disbursement worker error: {str(e)}")
+            
+            if not processed:
+                with self._wakeup:
+                    self._wakeup.wait(Config.DISBURSEMENT_POLL_INTERVAL)
+    
+    def process_next(self, worker_id='inline'):
+        """Claim and run one due job, returns False when the queue is empty"""
+        job = self._claim(worker_id)
+        if not job:
+            return False
+        
+        self._process(job)
+        return True
+    
+    def _claim(self, worker_id):
+        """Atomically take the oldest due job, including ones abandoned by a dead worker"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=Config.DISBURSEMENT_LOCK_TIMEOUT)
+        due = db.or_(
+            db.and_(DisbursementJob.status == 'queued', DisbursementJob.run_at <= now),
+            db.and_(DisbursementJob.status == 'running', DisbursementJob.locked_at < stale_before)
+        )
+        
+        candidates = db.session.query(DisbursementJob.id).filter(due) \
+            .order_by(DisbursementJob.run_at).limit(Config.DISBURSEMENT_WORKERS).all()
+        
+        for (job_id,) in candidates:
+            claimed = DisbursementJob.query.filter(DisbursementJob.id == job_id, due).update({
+                'status': 'running',
+                'attempts': DisbursementJob.attempts + 1,
+                'locked_at': now,
+                'locked_by': worker_id
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return db.session.get(DisbursementJob, job_id)
+        
+        return None
+    
+    def _process(self, job):
+        if job.batch_id:
+            transactions = Transaction.query.filter_by(batch_id=job.batch_id, status='pending') \
+                .order_by(Transaction.id).all()
+        else:
+            transactions = Transaction.query.filter_by(id=job.transaction_id, status='pending').all()
+        
+        if not transactions:
+            # Already settled by an earlier attempt that died before finishing the job
+            job.status = 'done'
+            db.session.commit()
+            return
+        
+        result = None
+        if job.raw_transaction:
+            # An earlier attempt signed this release and may have broadcast it
+            result = self.service.resume(job.raw_transaction, job.transaction_hash, job.sender, job.nonce)
+            if result.get("replaced"):
+                logger.warning(f"Disbursement job {job.id}: {result['error']}, signing a new transaction")
+                self._clear_signed(job)
+                result = None
+        
+        if result is None:
+            result = self._sign(job, transactions)
+            while result.get("too_large") and len(transactions) > 1:
+                transactions = self._split(job, transactions)
+                result = self._sign(job, transactions)
+            if result["success"]:
+                result = self.service.broadcast(job.raw_transaction, job.transaction_hash, job.sender)
+        
+        if result["success"] and Config.CONFIRMATION_TRACKER_ENABLED:
+            # The confirmation tracker completes them and settles the funds once mined
+            submitted_at = datetime.utcnow()
+            for transaction in transactions:
+                transaction.status = 'submitted'
+                transaction.transaction_hash = result["transaction_hash"]
+                transaction.submitted_at = submitted_at
+            job.status = 'done'
+            job.last_error = None
+        elif result["success"]:
+            completed_at = datetime.utcnow()
+            for transaction in transactions:
+                transaction.status = 'completed'
+                transaction.transaction_hash = result["transaction_hash"]
+                transaction.completed_at = completed_at
+            for fund_id, amount in fund_reservations.totals_by_fund(transactions).items():
+                fund_reservations.settle(fund_id, amount)
+            job.status = 'done'
+            job.last_error = None
+        elif job.attempts >= Config.DISBURSEMENT_MAX_ATTEMPTS and (not job.raw_transaction or result.get("rejected")):
+            # Only given up once the node refused the signed transaction, it could still be mined otherwise
+            for transaction in transactions:
+                transaction.status = 'failed'
+            for fund_id, amount in fund_reservations.totals_by_fund(transactions).items():
+                fund_reservations.release(fund_id, amount)
+            job.status = 'failed'
+            job.last_error = result.get("error")
+            logger.error(f"Disbursement job {job.id} failed after {job.attempts} attempts")
+        else:
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=self._backoff(job.attempts))
+            job.last_error = result.get("error")
+            logger.warning(f"Disbursement job {job.id} failed, retrying at {job.run_at}")
+        
+        job.locked_at = None
+        job.locked_by = None
+        db.session.commit()
+    
+    def _sign(self, job, transactions):
+        """Sign the release and commit it to the job before anything is broadcast"""
+        if job.batch_id:
+            result = self.service.sign_release_batch(
+                [tx.recipient_address for tx in transactions],
+                [tx.amount for tx in transactions]
+            )
+        else:
+            result = self.service.sign_release(transactions[0].recipient_address, transactions[0].amount)
+        
+        if not result["success"]:
+            return result
+        
+        job.raw_transaction = result["raw_transaction"]
+        job.transaction_hash = result["transaction_hash"]
+        job.sender = result["sender"]
+        job.nonce = result["nonce"]
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.service.release_nonce(result["sender"], result["nonce"])
+            raise
+        return result
+    
+    def _split(self, job, transactions):
+        """Move the second half of a batch that needs too much gas to a new job, returns the first half"""
+        keep = transactions[:len(transactions) // 2]
+        moved = transactions[len(keep):]
+        batch_id = str(uuid.uuid4())
+        for transaction in moved:
+            transaction.batch_id = batch_id
+        self.enqueue_batch(batch_id)
+        db.session.commit()
+        logger.warning(f"Disbursement job {job.id}: batch over the gas limit, moved {len(moved)} "
+                       f"recipients to batch {batch_id}")
+        return keep
+    
+    @staticmethod
+    def _clear_signed(job):
+        job.raw_transaction = None
+        job.transaction_hash = None
+        job.sender = None
+        job.nonce = None
+    
+    @staticmethod
+    def _backoff(attempts):
+        """Exponential backoff, randomized within the upper half to spread retries"""
+        delay = min(Config.DISBURSEMENT_RETRY_MAX_DELAY, Config.DISBURSEMENT_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+# Global instance
+disbursement_queue = DisbursementQueue()
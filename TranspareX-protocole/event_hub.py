@@ -0,0 +1,173 @@
+import json
+import logging
+import queue
+import threading
+import time
+from sqlalchemy import event
+from models import db, Transaction, BlockchainEvent
+from stats_service import dashboard_delta
+from table_versions import get_versions
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Tables whose changes by other processes are announced to clients
+SYNCED_TABLES = ('fund', 'transaction')
+
+def format_event(name, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+class EventStreamFull(Exception):
+    """Raised when this process already serves the maximum number of streams"""
+
+class Subscription:
+    """One connected client, with a bounded queue of encoded messages"""
+    __slots__ = ('user_id', 'is_admin', 'queue', 'overflowed')
+    
+    def __init__(self, principal, size):
+        self.user_id = principal.id
+        self.is_admin = principal.role == 'admin'
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+class EventHub:
+    """In-process fan-out of committed changes to Server-Sent Events clients.
+    
+    Every message is encoded once and put on the queue of each subscriber allowed to
+    see it. Idle subscribers only wait on their queue. A subscriber that falls too
+    far behind is sent a reset and disconnected, so it reloads instead of drifting.
+    
+    Commits made by other processes (web workers, the disbursement worker) are not
+    seen here, so while clients are connected a sync thread watches the table
+    versions and sends a "changed" event naming the tables to reload.
+    """
+    
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._rejected = 0
+        self._sync_thread = None
+    
+    def init_app(self, app):
+        """Bind the hub to a Flask application"""
+        self.app = app
+    
+    def subscribe(self, principal):
+        """Register a client and return its subscription.
+        
+        Each open stream holds a request thread for as long as it is connected, so
+        beyond EVENT_STREAM_MAX_CLIENTS streams EventStreamFull is raised to keep
+        threads free for API requests.
+        """
+        subscription = Subscription(principal, Config.EVENT_STREAM_QUEUE_SIZE)
+        with self._lock:
+            if len(self._subscribers) >= Config.EVENT_STREAM_MAX_CLIENTS:
+                self._rejected += 1
+                raise EventStreamFull("Too many live update streams, falling back to polling")
+            self._subscribers.add(subscription)
+            if self._sync_thread is None and self.app is not None and Config.EVENT_STREAM_SYNC_INTERVAL > 0:
+                self._sync_thread = threading.Thread(target=self._sync, name='event-hub-sync', daemon=True)
+                self._sync_thread.start()
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        """Forget a disconnected client"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+    
+    def publish(self, name, data, user_id=None):
+        """Send an event to every subscriber, or only to user_id and admins"""
+        message = format_event(name, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        
+        for subscription in subscribers:
+            if user_id is not None and not subscription.is_admin and subscription.user_id != user_id:
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                subscription.overflowed = True
+    
+    def listen(self, subscription):
+        """Yield the encoded messages of a subscription until the client goes away"""
+        try:
+            yield f"retry: {Config.EVENT_STREAM_RETRY_MS}\n\n"
+            while not subscription.overflowed:
+                try:
+                    yield subscription.queue.get(timeout=Config.EVENT_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    # Comment line, keeps proxies from closing the connection
+                    yield ": keepalive\n\n"
+            yield format_event('reset', {})
+        finally:
+            self.unsubscribe(subscription)
+    
+    def _sync(self):
+        """Announce tables changed by any process, exits once no client is connected"""
+        versions = None
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._sync_thread = None
+                    return
+            
+            try:
+                with self.app.app_context():
+                    current = get_versions()
+            except Exception as e:
+                logger.warning(f"Event stream sync failed: {str(e)}")
+                current = versions
+            
+            if versions is not None and current is not None:
+                changed = [name for name in SYNCED_TABLES if current.get(name) != versions.get(name)]
+                if changed:
+                    self.publish('changed', {'tables': changed})
+            versions = current
+            time.sleep(Config.EVENT_STREAM_SYNC_INTERVAL)
+    
+    def stats(self):
+        """Get the number of connected clients and of streams turned away"""
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "max_subscribers": Config.EVENT_STREAM_MAX_CLIENTS,
+                "rejected": self._rejected
+            }
+
+# Global instance
+event_hub = EventHub()
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_events(session, flush_context):
+    """Encode changes of this flush, they are published only if the transaction commits"""
+    pending = session.info.setdefault('hub_events', [])
+    
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            pending.append(('transaction', obj.to_dict(), obj.user_id))
+        elif isinstance(obj, BlockchainEvent):
+            pending.append(('fund_released', obj.to_dict(), None))
+    
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and db.inspect(obj).attrs.status.history.has_changes():
+            pending.append(('transaction', obj.to_dict(), obj.user_id))
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_events(session):
+    pending = session.info.pop('hub_events', None)
+    deltas = session.info.pop('stat_deltas', None)
+    
+    for name, data, user_id in pending or ():
+        event_hub.publish(name, data, user_id)
+    if deltas:
+        stats = dashboard_delta(deltas)
+        if stats:
+            event_hub.publish('stats', stats)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_events(session):
+    session.info.pop('hub_events', None)
+    session.info.pop('stat_deltas', None)
@@ -0,0 +1,113 @@
+import threading
+import logging
+from sqlalchemy.exc import IntegrityError
+from models import db, BlockchainEvent, IndexerCheckpoint
+from blockchain_service import blockchain_service
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'fund_released'
+
+class EventIndexer:
+    """Copies FundReleased logs into the local database, one block range at a time.
+    
+    The last fully processed block is stored in IndexerCheckpoint together with the
+    events of that range, so a restart resumes where the previous run stopped and
+    only new blocks are ever requested from the node.
+    """
+    
+    def __init__(self, service=None):
+        self.service = service or blockchain_service
+        self.app = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._sync_lock = threading.Lock()
+    
+    def init_app(self, app):
+        """Bind the indexer to a Flask application"""
+        self.app = app
+    
+    def start(self):
+        """Start the background indexing thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='event-indexer', daemon=True)
+        self._thread.start()
+        logger.info("Event indexer started")
+    
+    def stop(self, timeout=None):
+        """Stop the background indexing thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    self.sync_once()
+            except Exception as e:
+                logger.error(f"Event indexer pass failed: {str(e)}")
+            self._stop_event.wait(Config.EVENT_INDEXER_INTERVAL)
+    
+    def get_checkpoint(self):
+        """Get the last indexed block, or None if nothing has been indexed yet"""
+        checkpoint = db.session.get(IndexerCheckpoint, CHECKPOINT_NAME)
+        return checkpoint.last_block if checkpoint else None
+    
+    def sync_once(self):
+        """Index all new blocks up to the chain head, returns the number of stored events"""
+        with self._sync_lock:
+            if not self.service.is_connected():
+                return 0
+            
+            head = self.service.get_latest_block() - Config.EVENT_INDEXER_CONFIRMATIONS
+            last_block = self.get_checkpoint()
+            next_block = Config.EVENT_INDEXER_START_BLOCK if last_block is None else last_block + 1
+            
+            stored = 0
+            while next_block <= head and not self._stop_event.is_set():
+                to_block = min(head, next_block + Config.EVENT_INDEXER_BATCH_BLOCKS - 1)
+                events = self.service.fetch_fund_released_events(next_block, to_block)
+                
+                try:
+                    stored += self._store_range(next_block, to_block, events)
+                    db.session.commit()
+                except IntegrityError:
+                    # Another indexer process committed the same range first
+                    db.session.rollback()
+                    logger.info(f"Blocks {next_block}-{to_block} already indexed elsewhere")
+                
+                next_block = to_block + 1
+            
+            return stored
+    
+    def _store_range(self, from_block, to_block, events):
+        """Add the events of a block range and advance the checkpoint in the current session"""
+        existing = set(
+            db.session.query(BlockchainEvent.transaction_hash, BlockchainEvent.log_index)
+            .filter(BlockchainEvent.block_number.between(from_block, to_block))
+            .all()
+        )
+        
+        stored = 0
+        for event in events:
+            if (event["transaction_hash"], event["log_index"]) in existing:
+                continue
+            db.session.add(BlockchainEvent(**event))
+            stored += 1
+        
+        checkpoint = db.session.get(IndexerCheckpoint, CHECKPOINT_NAME)
+        if checkpoint:
+            checkpoint.last_block = to_block
+        else:
+            db.session.add(IndexerCheckpoint(name=CHECKPOINT_NAME, last_block=to_block))
+        
+        return stored
+
+# Global instance
+event_indexer = EventIndexer()
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from config import Config
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _encode_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(['' if value is None else _value(value) for value in row])
+        yield buffer.getvalue()
+
+def _encode_ndjson(columns, rows):
+    for row in rows:
+        yield json.dumps({column: _value(value) for column, value in zip(columns, row)}) + '\n'
+
+def _chunked(lines, size):
+    """Group small encoded lines into chunks of roughly size bytes"""
+    parts = []
+    length = 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield b''.join(parts)
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_rows(query, columns, fmt, compress=False):
+    """Encode the rows of a column query as CSV or NDJSON, one chunk at a time.
+    
+    Rows are fetched in server-side batches of EXPORT_BATCH_ROWS and never turned
+    into ORM objects, so memory use does not grow with the size of the export.
+    """
+    rows = query.yield_per(Config.EXPORT_BATCH_ROWS)
+    lines = _encode_csv(columns, rows) if fmt == 'csv' else _encode_ndjson(columns, rows)
+    chunks = _chunked(lines, Config.EXPORT_CHUNK_BYTES)
+    return _gzipped(chunks) if compress else chunks
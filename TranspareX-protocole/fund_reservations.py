@@ -0,0 +1,38 @@
+from models import db, Fund
+from table_versions import bump
+
+# Every balance change is a single conditional UPDATE, so concurrent requests never
+# read, compare and write the balance in Python. The database row lock taken by the
+# UPDATE is held only until the surrounding transaction commits.
+
+def reserve(fund_id, amount):
+    """Hold amount against a fund if its unreserved balance covers it, the caller commits"""
+    held = Fund.query.filter(
+        Fund.id == fund_id,
+        Fund.remaining_amount - Fund.reserved_amount >= amount
+    ).update({'reserved_amount': Fund.reserved_amount + amount}, synchronize_session=False)
+    if held:
+        bump(db.session.connection(), 'fund')
+    return held == 1
+
+def settle(fund_id, amount):
+    """Deduct a held amount from the fund once it has been released on chain"""
+    Fund.query.filter_by(id=fund_id).update({
+        'remaining_amount': Fund.remaining_amount - amount,
+        'reserved_amount': Fund.reserved_amount - amount
+    }, synchronize_session=False)
+    bump(db.session.connection(), 'fund')
+
+def release(fund_id, amount):
+    """Return a held amount to the fund after the release failed"""
+    Fund.query.filter_by(id=fund_id).update({
+        'reserved_amount': Fund.reserved_amount - amount
+    }, synchronize_session=False)
+    bump(db.session.connection(), 'fund')
+
+def totals_by_fund(transactions):
+    """Sum transaction amounts per fund"""
+    totals = {}
+    for transaction in transactions:
+        totals[transaction.fund_id] = totals.get(transaction.fund_id, 0) + transaction.amount
+    return totals
@@ -0,0 +1,59 @@
+import hashlib
+from functools import wraps
+from flask import request, make_response
+from rpc_cache import TTLCache
+from table_versions import get_versions
+from config import Config
+
+# Serialized bodies keyed by ETag, so a repeat request for an unchanged resource is a dict lookup
+response_cache = TTLCache(Config.RESPONSE_CACHE_TTL, Config.RESPONSE_CACHE_MAX_ENTRIES)
+
+class _Uncacheable(Exception):
+    """Carries an error response past the cache so it is returned but never stored"""
+    
+    def __init__(self, response):
+        self.response = response
+
+def versioned(*tables, per_user=None, extra=None):
+    """Decorator answering GETs with a strong ETag derived from table versions.
+    
+    A matching If-None-Match gets 304 before the view runs. per_user(current_user) tells
+    whether the body depends on the user, extra() returns any other input of the body,
+    such as the chain head for values read from the contract.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            versions = get_versions()
+            key = [
+                request.endpoint,
+                current_user.role,
+                current_user.id if per_user and per_user(current_user) else None,
+                request.query_string.decode(),
+                sorted(kwargs.items()),
+                [versions.get(table, 0) for table in tables],
+                extra() if extra else None
+            ]
+            etag = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+            
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                def load():
+                    response = make_response(f(current_user, *args, **kwargs))
+                    if response.status_code != 200:
+                        raise _Uncacheable(response)
+                    return response.get_data(), response.mimetype
+                
+                try:
+                    body, mimetype = response_cache.get_or_load(etag, load)
+                except _Uncacheable as e:
+                    return e.response
+                response = make_response(body)
+                response.mimetype = mimetype
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,188 @@
+import threading
+import time
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds in seconds, the usual Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Work done outside a request, by worker threads, is attributed to this route
+BACKGROUND_ROUTE = 'background'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms rendered in the Prometheus text format"""
+    
+    def __init__(self, prefix='transparex'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = {}  # name -> (type, help)
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+    
+    def describe(self, name, kind, help_text):
+        self._metrics[name] = (kind, help_text)
+    
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name, labels, value, buckets=DEFAULT_BUCKETS):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()),
+                key=lambda item: item[0]
+            )
+        
+        lines = []
+        for name, (kind, help_text) in sorted(self._metrics.items()):
+            full_name = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            
+            if kind == 'counter':
+                for (metric, labels), value in counters:
+                    if metric == name:
+                        lines.append(f'{full_name}{_format_labels(labels)} {value}')
+            else:
+                for (metric, labels), counts, total, count, buckets in histograms:
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f'{full_name}_bucket{_format_labels(labels, [("le", bound)])} {bucket_count}')
+                    lines.append(f'{full_name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+                    lines.append(f'{full_name}_sum{_format_labels(labels)} {total}')
+                    lines.append(f'{full_name}_count{_format_labels(labels)} {count}')
+        
+        return '\n'.join(lines) + '\n'
+
+class Metrics:
+    """Per-route request latency, SQL and JSON-RPC accounting.
+    
+    The route of the request being served is kept in a thread local, so SQL
+    statements seen by engine events and RPC calls seen by the Web3 middleware
+    are charged to the route that caused them.
+    """
+    
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self._local = threading.local()
+        self._engine_hooked = False
+        
+        describe = self.registry.describe
+        describe('http_request_duration_seconds', 'histogram', 'Request latency by route, method and status.')
+        describe('db_statements_total', 'counter', 'SQL statements executed, by route.')
+        describe('db_statement_seconds_total', 'counter', 'Time spent executing SQL statements, by route.')
+        describe('rpc_requests_total', 'counter', 'JSON-RPC calls, by route and method.')
+        describe('rpc_errors_total', 'counter', 'Failed JSON-RPC calls, by route and method.')
+        describe('rpc_seconds_total', 'counter', 'Time spent in JSON-RPC calls, by route and method.')
+    
+    def init_app(self, app):
+        """Time every request and start counting SQL statements"""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        
+        if not self._engine_hooked:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._engine_hooked = True
+    
+    def current_route(self):
+        return getattr(self._local, 'route', BACKGROUND_ROUTE)
+    
+    def _before_request(self):
+        self._local.route = request.url_rule.rule if request.url_rule else 'unmatched'
+        self._local.started = time.perf_counter()
+    
+    def _after_request(self, response):
+        started = getattr(self._local, 'started', None)
+        if started is not None:
+            self.registry.observe(
+                'http_request_duration_seconds',
+                [('route', self.current_route()), ('method', request.method), ('status', response.status_code)],
+                time.perf_counter() - started
+            )
+        return response
+    
+    def _teardown_request(self, exc):
+        self._local.__dict__.clear()
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        labels = [('route', self.current_route())]
+        self.registry.inc('db_statements_total', labels)
+        self.registry.inc('db_statement_seconds_total', labels, time.perf_counter() - started)
+    
+    def record_rpc(self, method, seconds, error=False):
+        """Charge one JSON-RPC call to the current route"""
+        labels = [('route', self.current_route()), ('method', method)]
+        self.registry.inc('rpc_requests_total', labels)
+        self.registry.inc('rpc_seconds_total', labels, seconds)
+        if error:
+            self.registry.inc('rpc_errors_total', labels)
+    
+    def rpc_middleware(self, labeler=None):
+        """Web3 middleware timing every call, labeler(method, params) names it"""
+        def middleware(make_request, w3):
+            def timed_request(method, params):
+                label = labeler(method, params) if labeler else method
+                started = time.perf_counter()
+                try:
+                    response = make_request(method, params)
+                except Exception:
+                    self.record_rpc(label, time.perf_counter() - started, error=True)
+                    raise
+                self.record_rpc(label, time.perf_counter() - started, error='error' in response)
+                return response
+            return timed_request
+        return middleware
+    
+    def render(self):
+        return self.registry.render()
+
+# Global instance
+metrics = Metrics()
@@ -0,0 +1,271 @@
+import logging
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, text
+from models import db, TableVersion, StreamTicket
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping table, kept out of db.metadata so create_all never touches it
+migration_metadata = MetaData()
+schema_migration = Table(
+    'schema_migration', migration_metadata,
+    Column('revision', String(32), primary_key=True),
+    Column('description', String(200)),
+    Column('applied_at', DateTime, default=datetime.utcnow)
+)
+
+class Migration:
+    """One schema revision.
+    
+    Transactional revisions run inside a transaction. Non-transactional ones run in
+    autocommit mode, which PostgreSQL needs for CREATE INDEX CONCURRENTLY, and must
+    be written so that running them again after a failure is safe.
+    """
+    
+    def __init__(self, revision, description, upgrade, downgrade, transactional=True):
+        self.revision = revision
+        self.description = description
+        self.upgrade = upgrade
+        self.downgrade = downgrade
+        self.transactional = transactional
+
+def _quote(conn, name):
+    return conn.dialect.identifier_preparer.quote(name)
+
+def create_index(conn, name, table, columns):
+    """Create an index if missing, without blocking writes on PostgreSQL"""
+    column_list = ', '.join(_quote(conn, column) for column in columns)
+    if conn.dialect.name == 'postgresql':
+        # A failed concurrent build leaves an invalid index behind, rebuild it
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {_quote(conn, name)}"))
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_quote(conn, name)} ON {_quote(conn, table)} ({column_list})"
+        ))
+    else:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {_quote(conn, name)} ON {_quote(conn, table)} ({column_list})"
+        ))
+
+def drop_index(conn, name):
+    """Drop an index if present, without blocking writes on PostgreSQL"""
+    concurrently = 'CONCURRENTLY ' if conn.dialect.name == 'postgresql' else ''
+    conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {_quote(conn, name)}"))
+
+def _has_column(conn, table, column):
+    return any(info['name'] == column for info in inspect(conn).get_columns(table))
+
+def add_column(conn, table, column, ddl):
+    """Add a column if missing, ddl is its type and constraints"""
+    if not _has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {_quote(conn, table)} ADD COLUMN {_quote(conn, column)} {ddl}"))
+
+def drop_column(conn, table, column):
+    """Drop a column if present"""
+    if _has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {_quote(conn, table)} DROP COLUMN {_quote(conn, column)}"))
+
+def _index_migration(revision, description, table, indexes):
+    """Build a non-transactional revision creating the given {name: columns} indexes"""
+    def upgrade(conn):
+        for name, columns in indexes.items():
+            create_index(conn, name, table, columns)
+    
+    def downgrade(conn):
+        for name in indexes:
+            drop_index(conn, name)
+    
+    return Migration(revision, description, upgrade, downgrade, transactional=False)
+
+def _baseline_upgrade(conn):
+    db.metadata.create_all(bind=conn)
+
+def _baseline_downgrade(conn):
+    raise click.ClickException("Cannot downgrade past the baseline revision")
+
+def _batch_upgrade(conn):
+    add_column(conn, 'transaction', 'batch_id', 'VARCHAR(36)')
+    create_index(conn, 'ix_transaction_batch_id', 'transaction', ['batch_id'])
+
+def _batch_downgrade(conn):
+    drop_index(conn, 'ix_transaction_batch_id')
+    drop_column(conn, 'transaction', 'batch_id')
+
+def _reservation_upgrade(conn):
+    add_column(conn, 'fund', 'reserved_amount', 'FLOAT DEFAULT 0 NOT NULL')
+    # Transactions still pending were accepted before reservations existed, hold them now
+    conn.execute(text(
+        f"UPDATE fund SET reserved_amount = (SELECT COALESCE(SUM(amount), 0) FROM {_quote(conn, 'transaction')} "
+        "WHERE fund_id = fund.id AND status = 'pending')"
+    ))
+
+def _reservation_downgrade(conn):
+    drop_column(conn, 'fund', 'reserved_amount')
+
+def _table_version_upgrade(conn):
+    TableVersion.__table__.create(bind=conn, checkfirst=True)
+
+def _table_version_downgrade(conn):
+    TableVersion.__table__.drop(bind=conn, checkfirst=True)
+
+SIGNED_TRANSACTION_COLUMNS = {
+    'transaction_hash': 'VARCHAR(66)',
+    'raw_transaction': 'TEXT',
+    'sender': 'VARCHAR(42)',
+    'nonce': 'INTEGER',
+}
+
+def _signed_transaction_upgrade(conn):
+    for column, ddl in SIGNED_TRANSACTION_COLUMNS.items():
+        add_column(conn, 'disbursement_job', column, ddl)
+
+def _signed_transaction_downgrade(conn):
+    for column in SIGNED_TRANSACTION_COLUMNS:
+        drop_column(conn, 'disbursement_job', column)
+
+def _stream_ticket_upgrade(conn):
+    StreamTicket.__table__.create(bind=conn, checkfirst=True)
+
+def _stream_ticket_downgrade(conn):
+    StreamTicket.__table__.drop(bind=conn, checkfirst=True)
+
+def _submitted_at_upgrade(conn):
+    add_column(conn, 'transaction', 'submitted_at', 'TIMESTAMP')
+
+def _submitted_at_downgrade(conn):
+    drop_column(conn, 'transaction', 'submitted_at')
+
+MIGRATIONS = [
+    Migration('0001', 'Baseline schema', _baseline_upgrade, _baseline_downgrade),
+    _index_migration('0002', 'Transaction hot-path indexes', 'transaction', {
+        'ix_transaction_created': ['created_at', 'id'],
+        'ix_transaction_status_created': ['status', 'created_at', 'id'],
+        'ix_transaction_user_created': ['user_id', 'created_at', 'id'],
+        'ix_transaction_fund_created': ['fund_id', 'created_at', 'id'],
+        'ix_transaction_hash': ['transaction_hash'],
+    }),
+    _index_migration('0003', 'Audit log indexes', 'audit_log', {
+        'ix_audit_log_created': ['created_at', 'id'],
+        'ix_audit_log_user_created': ['user_id', 'created_at', 'id'],
+        'ix_audit_log_action_created': ['action', 'created_at', 'id'],
+        'ix_audit_log_ip_created': ['ip_address', 'created_at', 'id'],
+    }),
+    Migration('0004', 'Transaction batch column', _batch_upgrade, _batch_downgrade, transactional=False),
+    Migration('0005', 'Fund reservations', _reservation_upgrade, _reservation_downgrade),
+    Migration('0006', 'Table versions', _table_version_upgrade, _table_version_downgrade),
+    Migration('0007', 'Disbursement job signed transactions', _signed_transaction_upgrade, _signed_transaction_downgrade),
+    Migration('0008', 'Stream tickets', _stream_ticket_upgrade, _stream_ticket_downgrade),
+    Migration('0009', 'Transaction submitted time', _submitted_at_upgrade, _submitted_at_downgrade),
+]
+
+def applied_revisions():
+    """Revisions recorded in the database, oldest first"""
+    migration_metadata.create_all(bind=db.engine)
+    with db.engine.connect() as conn:
+        return [row.revision for row in conn.execute(
+            schema_migration.select().order_by(schema_migration.c.revision)
+        )]
+
+def current_revision():
+    """Latest applied revision, or None for an unmanaged database"""
+    revisions = applied_revisions()
+    return revisions[-1] if revisions else None
+
+def pending_revisions():
+    """Revisions not yet applied to the database"""
+    applied = set(applied_revisions())
+    return [migration.revision for migration in MIGRATIONS if migration.revision not in applied]
+
+def _find(revision):
+    for index, migration in enumerate(MIGRATIONS):
+        if migration.revision == revision:
+            return index
+    raise click.ClickException(f"Unknown revision {revision}")
+
+def _run(migration, apply):
+    """Run one revision forwards (apply=True) or backwards and record the result"""
+    step = migration.upgrade if apply else migration.downgrade
+    if migration.transactional:
+        with db.engine.begin() as conn:
+            step(conn)
+            _record(conn, migration, apply)
+    else:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            step(conn)
+            _record(conn, migration, apply)
+
+def _record(conn, migration, applied):
+    if applied:
+        conn.execute(schema_migration.insert().values(
+            revision=migration.revision,
+            description=migration.description,
+            applied_at=datetime.utcnow()
+        ))
+    else:
+        conn.execute(schema_migration.delete().where(schema_migration.c.revision == migration.revision))
+
+def upgrade(target=None):
+    """Apply every pending revision up to target (default: the latest)"""
+    applied = set(applied_revisions())
+    last = _find(target) if target else len(MIGRATIONS) - 1
+    
+    ran = []
+    for migration in MIGRATIONS[:last + 1]:
+        if migration.revision in applied:
+            continue
+        logger.info(f"Applying {migration.revision}: {migration.description}")
+        _run(migration, apply=True)
+        ran.append(migration.revision)
+    return ran
+
+def downgrade(target=None):
+    """Revert applied revisions newer than target (default: one revision)"""
+    applied = applied_revisions()
+    if not applied:
+        return []
+    
+    keep = _find(target) if target else _find(applied[-1]) - 1
+    
+    ran = []
+    for migration in reversed(MIGRATIONS[keep + 1:]):
+        if migration.revision not in applied:
+            continue
+        logger.info(f"Reverting {migration.revision}: {migration.description}")
+        _run(migration, apply=False)
+        ran.append(migration.revision)
+    return ran
+
+db_cli = AppGroup('db', help='Manage database schema migrations.')
+
+@db_cli.command('upgrade')
+@click.argument('revision', required=False)
+def upgrade_command(revision):
+    """Apply pending migrations up to REVISION (default: latest)."""
+    ran = upgrade(revision)
+    click.echo(f"Applied {', '.join(ran)}" if ran else "Already up to date")
+
+@db_cli.command('downgrade')
+@click.argument('revision', required=False)
+def downgrade_command(revision):
+    """Revert migrations newer than REVISION (default: the latest one)."""
+    ran = downgrade(revision)
+    click.echo(f"Reverted {', '.join(ran)}" if ran else "Nothing to revert")
+
+@db_cli.command('current')
+def current_command():
+    """Show the current schema revision."""
+    click.echo(current_revision() or "No revision applied")
+
+@db_cli.command('history')
+def history_command():
+    """List every revision and whether it is applied."""
+    applied = set(applied_revisions())
+    for migration in MIGRATIONS:
+        marker = 'x' if migration.revision in applied else ' '
+        click.echo(f"[{marker}] {migration.revision} {migration.description}")
@@ -20,7 +20,7 @@ class User(db.Model):
     transactions = db.relationship('Transaction', backref='user', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=Config.PASSWORD_HASH_METHOD)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -59,7 +59,8 @@ class Fund(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     total_amount = db.Column(db.Float, nullable=False)
-    remaining_amount = db.Column(db.Float, nullable=False)
+    remaining_amount = db.Column(db.Float, nullable=False)  # not yet released on chain
+    reserved_amount = db.Column(db.Float, nullable=False, default=0.0, server_default='0')  # held by queued transactions
     status = db.Column(db.String(20), default='active')  # active, suspended, closed
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -75,6 +76,8 @@ class Fund(db.Model):
             'description': self.description,
             'total_amount': self.total_amount,
             'remaining_amount': self.remaining_amount,
+            'reserved_amount': self.reserved_amount,
+            'available_amount': self.remaining_amount - self.reserved_amount,
             'status': self.status,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat(),
@@ -82,16 +85,28 @@ class Fund(db.Model):
         }
 
 class Transaction(db.Model):
+    # Also created on existing databases by migration 0002
+    __table_args__ = (
+        db.Index('ix_transaction_created', 'created_at', 'id'),
+        db.Index('ix_transaction_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_transaction_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_transaction_fund_created', 'fund_id', 'created_at', 'id'),
+        db.Index('ix_transaction_hash', 'transaction_hash'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     fund_id = db.Column(db.Integer, db.ForeignKey('fund.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     recipient_address = db.Column(db.String(42), nullable=False)  # Ethereum address
     amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, completed, failed
+    # active_history loads the previous status on change so stats_service can move counters
+    status = db.column_property(db.Column(db.String(20), default='pending'), active_history=True)  # pending, submitted, completed, failed
     transaction_hash = db.Column(db.String(66))  # Ethereum transaction hash
     block_number = db.Column(db.Integer)
     gas_used = db.Column(db.Integer)
+    batch_id = db.Column(db.String(36), index=True)  # set when released through releaseFundsBatch
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_at = db.Column(db.DateTime)  # last broadcast, the confirmation tracker times out from here
     completed_at = db.Column(db.DateTime)
     
     def to_dict(self):
@@ -105,11 +120,21 @@ class Transaction(db.Model):
             'transaction_hash': self.transaction_hash,
             'block_number': self.block_number,
             'gas_used': self.gas_used,
+            'batch_id': self.batch_id,
             'created_at': self.created_at.isoformat(),
+            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
 
 class AuditLog(db.Model):
+    # Every filter is paired with the (created_at, id) keyset used for pagination, see migration 0003
+    __table_args__ = (
+        db.Index('ix_audit_log_created', 'created_at', 'id'),
+        db.Index('ix_audit_log_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_audit_log_action_created', 'action', 'created_at', 'id'),
+        db.Index('ix_audit_log_ip_created', 'ip_address', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     action = db.Column(db.String(100), nullable=False)
@@ -128,3 +153,88 @@ class AuditLog(db.Model):
             'user_agent': self.user_agent,
             'created_at': self.created_at.isoformat()
         }
+
+class BlockchainEvent(db.Model):
+    """Decoded FundReleased log, filled by the background event indexer"""
+    __table_args__ = (
+        db.UniqueConstraint('transaction_hash', 'log_index', name='uq_blockchain_event_log'),
+        db.Index('ix_blockchain_event_block', 'block_number', 'log_index'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_hash = db.Column(db.String(66), nullable=False)
+    log_index = db.Column(db.Integer, nullable=False)
+    block_number = db.Column(db.Integer, nullable=False)
+    recipient = db.Column(db.String(42), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    indexed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'transaction_hash': self.transaction_hash,
+            'recipient': self.recipient,
+            'amount': self.amount,
+            'block_number': self.block_number,
+            'log_index': self.log_index
+        }
+
+class IndexerCheckpoint(db.Model):
+    """Last block fully processed by a named indexer"""
+    name = db.Column(db.String(50), primary_key=True)
+    last_block = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StatsCounter(db.Model):
+    """Materialized dashboard counter, maintained by stats_service on every flush"""
+    key = db.Column(db.String(64), primary_key=True)  # funds, transactions, status:<status>, fund:<id>
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0)
+
+class TableVersion(db.Model):
+    """Write counter of a table, bumped by table_versions in the same transaction as the write"""
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class StreamTicket(db.Model):
+    """Single-use ticket opening one /api/stream connection, stored as a SHA-256 digest"""
+    id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class DisbursementJob(db.Model):
+    """Queued on-chain release of a transaction, processed by disbursement_queue workers"""
+    __table_args__ = (
+        db.Index('ix_disbursement_job_ready', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), unique=True)  # single release
+    batch_id = db.Column(db.String(36), unique=True)  # batch release of every transaction with this batch_id
+    status = db.Column(db.String(20), default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, default=0)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow)  # not picked up before this time
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+    # Signed transaction, committed before it is broadcast so a retry sends the same one
+    transaction_hash = db.Column(db.String(66))
+    raw_transaction = db.Column(db.Text)
+    sender = db.Column(db.String(42))
+    nonce = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'transaction_id': self.transaction_id,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'last_error': self.last_error,
+            'transaction_hash': self.transaction_hash,
+            'nonce': self.nonce,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
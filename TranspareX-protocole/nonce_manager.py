@@ -0,0 +1,63 @@
+import heapq
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _AccountNonces:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_nonce = None  # None until synced with the node
+        self.gaps = []  # nonces handed out but never broadcast, reused first
+
+class NonceAllocator:
+    """Thread-safe nonce allocation per sending account.
+    
+    The first allocation reads the pending transaction count from the node, later
+    ones are served from memory so several transactions can be sent back to back
+    without waiting for each other. A nonce that was never broadcast is returned
+    with release() and handed out again; after an ambiguous send failure resync()
+    makes the next allocation read the node state again.
+    
+    Nonces are tracked per process, so each sending account must be used by a
+    single process at a time.
+    """
+    
+    def __init__(self, web3):
+        self.web3 = web3
+        self._accounts = {}
+        self._lock = threading.Lock()
+    
+    def _state(self, account):
+        with self._lock:
+            return self._accounts.setdefault(account, _AccountNonces())
+    
+    def allocate(self, account):
+        """Reserve the next nonce for an account"""
+        state = self._state(account)
+        with state.lock:
+            if state.next_nonce is None:
+                state.next_nonce = self.web3.eth.get_transaction_count(account, 'pending')
+                state.gaps = []
+            
+            if state.gaps:
+                return heapq.heappop(state.gaps)
+            
+            nonce = state.next_nonce
+            state.next_nonce += 1
+            return nonce
+    
+    def release(self, account, nonce):
+        """Return a nonce that was allocated but not broadcast"""
+        state = self._state(account)
+        with state.lock:
+            if state.next_nonce is not None and nonce < state.next_nonce and nonce not in state.gaps:
+                heapq.heappush(state.gaps, nonce)
+    
+    def resync(self, account):
+        """Forget the local counter so the next allocation asks the node again"""
+        state = self._state(account)
+        with state.lock:
+            state.next_nonce = None
+            state.gaps = []
+        logger.info(f"Nonce counter for {account} will be resynced with the node")
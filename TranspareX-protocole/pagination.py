@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from config import Config
+
+def encode_cursor(created_at, row_id):
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (created_at, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def parse_limit(value, default=None, maximum=None):
+    """Parse a page size request argument, clamped to the configured maximum"""
+    default = default or Config.PAGE_SIZE_DEFAULT
+    maximum = maximum or Config.PAGE_SIZE_MAX
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, maximum)
+
+def parse_datetime(value, name):
+    """Parse an optional ISO 8601 request argument"""
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date")
+
+def parse_float(value, name):
+    """Parse an optional numeric request argument"""
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+def keyset_page(query, created_column, id_column, cursor=None, limit=None):
+    """Fetch one page of a query ordered newest first on (created_at, id).
+    
+    The cursor is turned into a row-value comparison on the sort key, so the
+    database seeks straight to the page instead of skipping OFFSET rows.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = limit or Config.PAGE_SIZE_DEFAULT
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_column, id_column) < tuple_(created_at, row_id))
+    
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    
+    return rows, next_cursor
@@ -0,0 +1,152 @@
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password operations are already waiting"""
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+class PasswordHasher:
+    """Runs the password KDF in a dedicated, bounded process pool.
+    
+    PBKDF2 at its default cost takes hundreds of milliseconds of CPU. Running it in
+    separate processes keeps it from competing with request threads, and a cap on
+    in-flight operations turns a login storm into fast 503s instead of a backlog.
+    """
+    
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._stored_method = None  # (configured method, the form werkzeug stores it in)
+    
+    @property
+    def method(self):
+        """Werkzeug method string for new hashes, e.g. pbkdf2:sha256:600000"""
+        return Config.PASSWORD_HASH_METHOD
+    
+    def hash(self, password):
+        """Hash a password at the configured cost"""
+        return self._call(_hash, password, self.method)
+    
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        return self._call(_verify, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with a different method or cost"""
+        stored_method = self._get_stored_method()
+        return stored_method is not None and password_hash.split('$', 1)[0] != stored_method
+    
+    def _get_stored_method(self):
+        """Method prefix of new hashes, e.g. 'scrypt:32768:8:1' when configured as 'scrypt'.
+        
+        Werkzeug fills in default parameters, so it is read from a real hash, made
+        once per configured method. Returns None if the pool is busy, the next login
+        tries again.
+        """
+        method = self.method
+        if not self._stored_method or self._stored_method[0] != method:
+            try:
+                self._stored_method = (method, self.hash('x').split('$', 1)[0])
+            except PasswordHasherBusy:
+                return None
+        return self._stored_method[1]
+    
+    def _call(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= Config.PASSWORD_HASH_MAX_PENDING:
+                self._rejected += 1
+                raise PasswordHasherBusy("Too many login attempts in progress, please retry")
+            self._in_flight += 1
+        
+        if Config.PASSWORD_HASH_WORKERS <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._finished()
+        return self._submit(fn, *args)
+    
+    def _finished(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+    
+    def _submit(self, fn, *args):
+        # The process pool modules load with the first password operation, not at app import
+        from concurrent.futures.process import BrokenProcessPool
+        
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BaseException as e:
+            self._finished()
+            if isinstance(e, BrokenProcessPool):
+                self._restart(executor)
+            raise
+        # Counted until the pool is done with it, cancel() cannot stop a hash that already started
+        future.add_done_callback(self._finished)
+        
+        try:
+            return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordHasherBusy("Password check timed out, please retry")
+        except BrokenProcessPool:
+            self._restart(executor)
+    
+    def _restart(self, executor):
+        """A worker died, start a fresh pool on the next call"""
+        logger.error("Password hashing pool broke, restarting it")
+        self._discard(executor)
+        raise PasswordHasherBusy("Password service restarting, please retry")
+    
+    def _get_executor(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with self._lock:
+            if self._executor is None:
+                # Spawn rather than fork, forking a process that runs threads can deadlock the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=Config.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"Started password hashing pool with {Config.PASSWORD_HASH_WORKERS} workers")
+            return self._executor
+    
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self):
+        """Pool size, operations in flight and requests turned away"""
+        with self._lock:
+            return {
+                "method": self.method,
+                "workers": Config.PASSWORD_HASH_WORKERS,
+                "in_flight": self._in_flight,
+                "max_pending": Config.PASSWORD_HASH_MAX_PENDING,
+                "rejected": self._rejected
+            }
+
+# Global instance
+password_hasher = PasswordHasher()
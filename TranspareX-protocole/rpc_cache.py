@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+class _Flight:
+    """A load in progress that other callers can wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class TTLCache:
+    """Thread-safe TTL cache with single-flight loading.
+    
+    When several threads miss the same key at once, only the first one runs the
+    loader; the others wait for its result instead of issuing their own call.
+    Loader exceptions are passed to every waiter and are never cached.
+    """
+    
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() at most once on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            
+            flight = self._inflight.get(key)
+            if flight:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                leader = True
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+        
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._store(key, flight.value)
+                del self._inflight[key]
+            flight.done.set()
+        
+        return flight.value
+    
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Get hit, miss and coalesced counters"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import HTTPProvider
+
+logger = logging.getLogger(__name__)
+
+# Read-only methods that are safe to send again after a connection error or timeout
+IDEMPOTENT_METHODS = frozenset({
+    'web3_clientVersion',
+    'net_version',
+    'eth_accounts',
+    'eth_blockNumber',
+    'eth_call',
+    'eth_chainId',
+    'eth_estimateGas',
+    'eth_gasPrice',
+    'eth_getBalance',
+    'eth_getBlockByNumber',
+    'eth_getCode',
+    'eth_getLogs',
+    'eth_getTransactionByHash',
+    'eth_getTransactionCount',
+    'eth_getTransactionReceipt',
+})
+
+RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+
+class LatencyRecorder:
+    """Per-method call counts, errors and latency"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+    
+    def record(self, method, seconds, error=False):
+        with self._lock:
+            stats = self._methods.setdefault(method, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["errors"] += 1 if error else 0
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+    
+    def snapshot(self):
+        """Get call statistics per method, latencies in milliseconds"""
+        with self._lock:
+            return {
+                method: {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(1000 * stats["total"] / stats["count"], 3),
+                    "max_ms": round(1000 * stats["max"], 3)
+                }
+                for method, stats in self._methods.items()
+            }
+
+class PooledHTTPProvider(HTTPProvider):
+    """HTTP provider sharing one keep-alive connection pool across threads.
+    
+    The stock provider keeps a session per thread, so each worker thread opens
+    its own connections. This provider posts every request through a single
+    session with connect and read timeouts, retries idempotent reads with jittered
+    backoff and records the latency of each call.
+    """
+    
+    # Replaces web3's retry middleware, which also resends transactions
+    _middlewares = ()
+    
+    def __init__(self, endpoint_uri, pool_size=20, connect_timeout=3, read_timeout=10,
+                 max_retries=2, retry_backoff=0.1):
+        self.pool_size = pool_size
+        self.session = self._new_session()
+        
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.latency = LatencyRecorder()
+        super().__init__(endpoint_uri, request_kwargs={'timeout': self.timeout})
+    
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def post_raw(self, data, label, idempotent=True):
+        """POST an encoded JSON-RPC payload, returns the raw response body"""
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        
+        for attempt in range(attempts):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(
+                    self.endpoint_uri,
+                    data=data,
+                    headers={'Content-Type': 'application/json'},
+                    timeout=self.timeout
+                )
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                self.latency.record(label, time.perf_counter() - start)
+                response.raise_for_status()
+                return response.content
+                
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                self.latency.record(label, time.perf_counter() - start, error=True)
+                retryable = not isinstance(e, requests.HTTPError) or e.response.status_code in RETRYABLE_STATUS_CODES
+                if attempt == attempts - 1 or not retryable:
+                    raise
+                
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"RPC {label} failed ({str(e)}), retry {attempt + 1} of {self.max_retries}")
+                time.sleep(random.uniform(0, delay))
+    
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = self.post_raw(request_data, method, idempotent=method in IDEMPOTENT_METHODS)
+        return self.decode_rpc_response(raw_response)
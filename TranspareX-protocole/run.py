@@ -1,14 +1,56 @@
 #!/usr/bin/env python3
 """
 TranspareX Application Startup Script
-Run this script to start the TranspareX application
+Run this script to start the TranspareX application with the development server,
+or with --production to serve it from pre-forked gunicorn workers
 """
 
+import argparse
 import os
 import sys
-from app import app
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Start the TranspareX application')
+    parser.add_argument('--production', action='store_true',
+                        help='serve with pre-forked gunicorn workers instead of the development server')
+    parser.add_argument('--bind', help='address to listen on (default SERVER_BIND)')
+    parser.add_argument('--workers', type=int, help='worker processes (default SERVER_WORKERS)')
+    parser.add_argument('--threads', type=int, help='request threads per worker (default SERVER_THREADS)')
+    parser.add_argument('--max-requests', type=int,
+                        help='recycle a worker after this many requests, 0 never (default SERVER_MAX_REQUESTS)')
+    return parser.parse_args()
+
+def run_production(app, args):
+    """Serve the preloaded app with gunicorn until the process is stopped"""
+    try:
+        from server import ProductionServer
+    except ImportError:
+        print("❌ Production mode needs gunicorn: pip install gunicorn")
+        sys.exit(1)
+    
+    server = ProductionServer(app, bind=args.bind, workers=args.workers, threads=args.threads,
+                              max_requests=args.max_requests)
+    print(f"🌐 Serving on {server.options['bind']} with {server.options['workers']} workers "
+          f"x {server.options['threads']} threads")
+    print("=" * 60)
+    server.run()
 
 if __name__ == '__main__':
+    args = parse_args()
+    
+    # Imported here so processes spawned by the app (password hashing pool) skip it
+    from app import app, init_database
+    from config import Config
+    
+    if args.production:
+        print("🚀 Starting TranspareX Application (production)...")
+        # Bootstrapping runs once in the master, before the workers are forked
+        with app.app_context():
+            if not init_database(upgrade=Config.AUTO_MIGRATE):
+                sys.exit(1)
+        run_production(app, args)
+        sys.exit(0)
+    
     # Set environment variables for development
     os.environ.setdefault('FLASK_ENV', 'development')
     os.environ.setdefault('FLASK_DEBUG', '1')
@@ -20,6 +62,10 @@ if __name__ == '__main__':
     print("=" * 60)
     
     try:
+        # Schema and admin bootstrapping happen here, never on import
+        with app.app_context():
+            init_database(upgrade=Config.AUTO_MIGRATE)
+        
         app.run(
             host='0.0.0.0',
             port=5000,
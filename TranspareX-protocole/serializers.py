@@ -0,0 +1,85 @@
+import json
+import re
+from datetime import datetime
+from flask import current_app
+from models import db
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used instead
+    orjson = None
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+def _escape(match):
+    code = ord(match.group())
+    if code < 0x10000:
+        return '\\u%04x' % code
+    # Outside the BMP, written as a UTF-16 surrogate pair like json does
+    code -= 0x10000
+    return '\\u%04x\\u%04x' % (0xd800 | code >> 10, 0xdc00 | code & 0x3ff)
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _orjson_differs(values):
+    """True if any value is a number orjson writes differently from json.
+    
+    These are floats below 1e-4 or from 1e16 up (json writes 1e-05 and 1e+16), NaN and
+    infinities, and integers orjson cannot encode.
+    """
+    for value in values:
+        kind = type(value)
+        if kind is str:
+            continue
+        if kind is float:
+            if value and not 1e-4 <= abs(value) < 1e16:
+                return True
+        elif kind is int:
+            if not -2 ** 63 <= value < 2 ** 64:
+                return True
+        elif kind is dict:
+            if _orjson_differs(value.values()):
+                return True
+        elif kind is list or kind is tuple:
+            if _orjson_differs(value):
+                return True
+    return False
+
+def dumps(obj):
+    """Encode obj like jsonify does (sorted keys, compact, ASCII only), with datetimes as ISO 8601.
+    
+    Bodies holding numbers that orjson formats differently are encoded by json instead,
+    so the output is the same either way.
+    """
+    if orjson and not _orjson_differs((obj,)):
+        body = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        if body.isascii():
+            return body
+        # orjson writes raw UTF-8, jsonify escapes everything outside ASCII
+        return _NON_ASCII.sub(_escape, body.decode()).encode()
+    return (json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':')) + '\n').encode()
+
+def json_response(obj, status=200):
+    """Build a JSON response with dumps instead of jsonify"""
+    return current_app.response_class(dumps(obj), status=status, mimetype='application/json')
+
+def column_query(model):
+    """Query every column of a model as plain rows, without building ORM objects"""
+    return db.session.query(*model.__table__.columns)
+
+def row_dicts(rows):
+    """Turn plain rows of column_query into dicts with the keys of the model's to_dict()"""
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+def fund_dicts(rows):
+    """Like row_dicts, adding the computed fields of Fund.to_dict()"""
+    funds = row_dicts(rows)
+    for fund in funds:
+        fund['available_amount'] = fund['remaining_amount'] - fund['reserved_amount']
+    return funds
@@ -0,0 +1,100 @@
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from gunicorn.app.base import BaseApplication
+from models import db
+from app import stop_background_services
+from blockchain_service import blockchain_service
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ProductionServer(BaseApplication):
+    """Pre-forking gunicorn server for the TranspareX app.
+    
+    The app is imported once by the master and inherited by forked workers, which
+    recreate their database and node connections after the fork and start their
+    background services with their first request. Disbursements are sent by one
+    dedicated child process, since nonces are allocated per process, and the same
+    process runs the event indexer so that workers do not poll the same blocks.
+    """
+    
+    def __init__(self, app, bind=None, workers=None, threads=None, max_requests=None):
+        self.application = app
+        self.options = {
+            'bind': bind or Config.SERVER_BIND,
+            'workers': workers or Config.SERVER_WORKERS,
+            'threads': threads or Config.SERVER_THREADS,
+            'worker_class': 'gthread',
+            'max_requests': Config.SERVER_MAX_REQUESTS if max_requests is None else max_requests,
+            'max_requests_jitter': Config.SERVER_MAX_REQUESTS_JITTER,
+            'timeout': Config.SERVER_TIMEOUT,
+            'graceful_timeout': Config.SERVER_GRACEFUL_TIMEOUT,
+            'preload_app': True,
+            'accesslog': '-'
+        }
+        self._disbursement_process = None
+        self._stopping = threading.Event()
+        self.run_disbursements = app.config['DISBURSEMENT_WORKERS_ENABLED']
+        # Web workers only enqueue, the dedicated process sends, tracks confirmations and indexes events
+        app.config['DISBURSEMENT_WORKERS_ENABLED'] = False
+        app.config['CONFIRMATION_TRACKER_ENABLED'] = False
+        app.config['EVENT_INDEXER_ENABLED'] = False
+        super().__init__()
+    
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('on_starting', self.on_starting)
+        self.cfg.set('post_fork', self.post_fork)
+        self.cfg.set('worker_exit', self.worker_exit)
+        self.cfg.set('on_exit', self.on_exit)
+    
+    def load(self):
+        return self.application
+    
+    def on_starting(self, server):
+        """Master hook, starts the disbursement process"""
+        if self.run_disbursements:
+            threading.Thread(target=self._supervise_disbursements, name='disbursement-supervisor', daemon=True).start()
+    
+    def post_fork(self, server, worker):
+        """Worker hook, replaces connections inherited from the master"""
+        with self.application.app_context():
+            # Leave the master's pooled connections open for it, open new ones here
+            db.engine.dispose(close=False)
+        blockchain_service.after_fork()
+    
+    def worker_exit(self, server, worker):
+        """Worker hook, stops background services once requests are drained"""
+        stop_background_services(self.application, timeout=Config.SERVER_GRACEFUL_TIMEOUT)
+    
+    def on_exit(self, server):
+        """Master hook, stops the disbursement process after the workers"""
+        self._stopping.set()
+        process = self._disbursement_process
+        if process and process.poll() is None:
+            # SIGINT lets running jobs finish
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(Config.SERVER_GRACEFUL_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    
+    def _supervise_disbursements(self):
+        """Run 'flask disbursement-worker' and restart it if it dies"""
+        while not self._stopping.is_set():
+            self._disbursement_process = subprocess.Popen(
+                [sys.executable, '-m', 'flask', '--app', 'app', 'disbursement-worker'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                start_new_session=True  # a Ctrl+C in the terminal reaches it only through on_exit
+            )
+            logger.info(f"Started disbursement process {self._disbursement_process.pid}")
+            code = self._disbursement_process.wait()
+            if not self._stopping.is_set():
+                logger.error(f"Disbursement process exited with {code}, restarting")
+                time.sleep(5)
@@ -188,6 +188,7 @@ class TranspareXApp {
     }
 
     updateStats(stats) {
+        this.stats = stats;
         document.getElementById('totalFunds').textContent = stats.total_funds || 0;
         document.getElementById('totalTransactions').textContent = stats.total_transactions || 0;
         document.getElementById('completedTransactions').textContent = stats.completed_transactions || 0;
@@ -244,6 +245,7 @@ class TranspareXApp {
                 <h4>${fund.name}</h4>
                 <p><strong>Total:</strong> ${fund.total_amount} ETH</p>
                 <p><strong>Remaining:</strong> ${fund.remaining_amount} ETH</p>
+                <p><strong>Reserved:</strong> ${fund.reserved_amount} ETH</p>
                 <p><strong>Status:</strong> <span class="status-badge status-${fund.status}">${fund.status}</span></p>
                 <p><strong>Created:</strong> ${new Date(fund.created_at).toLocaleDateString()}</p>
             </div>
@@ -252,7 +254,7 @@ class TranspareXApp {
 
     async loadTransactions() {
         try {
-            const response = await fetch(`${this.apiBase}/transactions`, {
+            const response = await fetch(`${this.apiBase}/transactions?limit=5`, {
                 headers: this.getAuthHeaders()
             });
             
@@ -289,6 +291,7 @@ class TranspareXApp {
                 <p><strong>Status:</strong> <span class="status-badge status-${tx.status}">${tx.status}</span></p>
                 <p><strong>Created:</strong> ${new Date(tx.created_at).toLocaleDateString()}</p>
                 ${tx.transaction_hash ? `<p><strong>Hash:</strong> ${tx.transaction_hash.substring(0, 10)}...</p>` : ''}
+                ${tx.block_number ? `<p><strong>Block:</strong> ${tx.block_number} (${tx.gas_used} gas)</p>` : ''}
             </div>
         `).join('');
     }
@@ -302,6 +305,7 @@ class TranspareXApp {
             if (response.ok) {
                 const data = await response.json();
                 if (data.success) {
+                    this.events = data.events;
                     this.displayBlockchainEvents(data.events);
                 }
             }
@@ -361,6 +365,7 @@ class TranspareXApp {
                 
                 console.log('Login successful, token stored:', this.token.substring(0, 20) + '...');
                 console.log('User data:', this.user);
+                this.connectEventStream();
                 
                 messageEl.textContent = 'Login successful!';
                 messageEl.className = 'message success';
@@ -469,7 +474,7 @@ class TranspareXApp {
             const data = await response.json();
             
             if (data.success) {
-                messageEl.textContent = 'Transaction created successfully!';
+                messageEl.textContent = 'Transaction submitted! It will be released shortly.';
                 messageEl.className = 'message success';
                 
                 setTimeout(() => {
@@ -501,10 +506,10 @@ class TranspareXApp {
                     select.innerHTML = '<option value="">Select a fund</option>';
                     
                     data.funds.forEach(fund => {
-                        if (fund.remaining_amount > 0) {
+                        if (fund.available_amount > 0) {
                             const option = document.createElement('option');
                             option.value = fund.id;
-                            option.textContent = `${fund.name} (${fund.remaining_amount} ETH available)`;
+                            option.textContent = `${fund.name} (${fund.available_amount} ETH available)`;
                             select.appendChild(option);
                         }
                     });
@@ -516,6 +521,7 @@ class TranspareXApp {
     }
 
     logout() {
+        this.disconnectEventStream();
         this.token = null;
         this.user = null;
         localStorage.removeItem('token');
@@ -571,14 +577,136 @@ class TranspareXApp {
     }
 
     startRealTimeUpdates() {
-        // Update dashboard stats every 30 seconds
-        setInterval(() => {
+        // Updates are pushed over Server-Sent Events, polling is only a fallback
+        if (window.EventSource) {
+            this.connectEventStream();
+        } else {
+            this.startPolling();
+        }
+    }
+
+    startPolling() {
+        if (this.pollTimer) {
+            return;
+        }
+        // Update dashboard stats every 30 seconds and try to switch back to the stream
+        this.pollTimer = setInterval(() => {
             if (this.token) {
                 this.loadDashboardStats();
                 this.loadBlockchainEvents();
+                this.connectEventStream();
             }
         }, 30000);
     }
+
+    stopPolling() {
+        clearInterval(this.pollTimer);
+        this.pollTimer = null;
+    }
+
+    async connectEventStream() {
+        if (!window.EventSource || !this.token || this.isTokenExpired() || this.eventSource || this.streamConnecting) {
+            return;
+        }
+
+        // EventSource cannot send headers, and the session token must not end up in
+        // access logs, so the stream is opened with a short-lived single-use ticket
+        this.streamConnecting = true;
+        let ticket;
+        try {
+            const response = await this.makeAuthenticatedRequest(`${this.apiBase}/stream/ticket`, { method: 'POST' });
+            ticket = (await response.json()).ticket;
+        } catch (error) {
+            console.error('Could not get a stream ticket:', error);
+        } finally {
+            this.streamConnecting = false;
+        }
+        if (!ticket || !this.token || this.eventSource) {
+            this.startPolling();
+            return;
+        }
+
+        const source = new EventSource(`${this.apiBase}/stream?ticket=${encodeURIComponent(ticket)}`);
+        this.eventSource = source;
+
+        source.addEventListener('open', () => {
+            this.streamRetryDelay = 3000;
+            this.stopPolling();
+            // Catch up on anything missed while disconnected
+            this.loadDashboardStats();
+        });
+        source.addEventListener('stats', (e) => this.applyStatsDelta(JSON.parse(e.data)));
+        source.addEventListener('transaction', () => {
+            this.scheduleRefresh('transactions', () => {
+                this.loadTransactions();
+                this.loadFunds();
+            });
+        });
+        source.addEventListener('fund_released', (e) => {
+            this.events = (this.events || []).concat([JSON.parse(e.data)]);
+            this.displayBlockchainEvents(this.events);
+            this.scheduleRefresh('stats', () => this.loadDashboardStats());
+        });
+        source.addEventListener('changed', (e) => {
+            // Written by another server process, the stream carries no details for it
+            const tables = JSON.parse(e.data).tables || [];
+            if (tables.includes('transaction') || tables.includes('fund')) {
+                this.scheduleRefresh('transactions', () => {
+                    this.loadTransactions();
+                    this.loadFunds();
+                });
+                this.scheduleRefresh('stats', () => this.loadDashboardStats());
+            }
+        });
+        source.addEventListener('reset', () => {
+            // The server dropped updates for this client, reload everything and reconnect
+            this.disconnectEventStream();
+            this.loadDashboardData();
+            this.connectEventStream();
+        });
+        source.onerror = () => {
+            // The browser would reconnect with the spent ticket, reconnect with a new one instead.
+            // Back off while the server refuses streams (503 when its stream slots are full)
+            source.close();
+            if (this.eventSource === source) {
+                this.eventSource = null;
+                this.startPolling();
+                const delay = this.streamRetryDelay || 3000;
+                this.streamRetryDelay = Math.min(delay * 2, 60000);
+                clearTimeout(this.streamRetryTimer);
+                this.streamRetryTimer = setTimeout(() => this.connectEventStream(), delay);
+            }
+        };
+    }
+
+    disconnectEventStream() {
+        clearTimeout(this.streamRetryTimer);
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        this.stopPolling();
+    }
+
+    applyStatsDelta(delta) {
+        if (!this.stats) {
+            this.loadDashboardStats();
+            return;
+        }
+        ['total_funds', 'total_transactions', 'completed_transactions', 'total_amount_disbursed'].forEach(field => {
+            if (delta[field]) {
+                this.stats[field] = (this.stats[field] || 0) + delta[field];
+            }
+        });
+        this.updateStats(this.stats);
+    }
+
+    scheduleRefresh(name, load) {
+        // Coalesce bursts of events, such as a batch release, into one reload
+        this.refreshTimers = this.refreshTimers || {};
+        clearTimeout(this.refreshTimers[name]);
+        this.refreshTimers[name] = setTimeout(load, 500);
+    }
 }
 
 // Initialize the application when the DOM is loaded
@@ -0,0 +1,177 @@
+import logging
+from collections import defaultdict
+from sqlalchemy import event
+from models import db, Fund, Transaction, StatsCounter
+from table_versions import bump
+from upsert import increment
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('pending', 'submitted', 'completed', 'failed')
+
+def _fund_key(fund_id):
+    return f'fund:{fund_id}'
+
+def _status_key(status):
+    return f'status:{status}'
+
+def _collect_deltas(session):
+    """Compute counter deltas for the Fund and Transaction rows written by a flush"""
+    deltas = defaultdict(lambda: [0, 0.0])
+    
+    def add(key, count, amount=0.0):
+        deltas[key][0] += count
+        deltas[key][1] += amount
+    
+    def add_transaction(tx, sign):
+        status = tx.status or 'pending'
+        add('transactions', sign)
+        add(_status_key(status), sign, sign * tx.amount)
+        add(_fund_key(tx.fund_id), sign, sign * tx.amount if status == 'completed' else 0.0)
+    
+    for obj in session.new:
+        if isinstance(obj, Fund):
+            add('funds', 1)
+            add(_fund_key(obj.id), 0)
+        elif isinstance(obj, Transaction):
+            add_transaction(obj, 1)
+    
+    for obj in session.dirty:
+        if not isinstance(obj, Transaction):
+            continue
+        history = db.inspect(obj).attrs.status.history
+        if not history.has_changes() or not history.deleted:
+            continue
+        old_status, new_status = history.deleted[0] or 'pending', obj.status
+        if old_status == new_status:
+            continue
+        add(_status_key(old_status), -1, -obj.amount)
+        add(_status_key(new_status), 1, obj.amount)
+        if old_status == 'completed':
+            add(_fund_key(obj.fund_id), 0, -obj.amount)
+        if new_status == 'completed':
+            add(_fund_key(obj.fund_id), 0, obj.amount)
+    
+    for obj in session.deleted:
+        if isinstance(obj, Fund):
+            add('funds', -1)
+        elif isinstance(obj, Transaction):
+            add_transaction(obj, -1)
+    
+    return deltas
+
+@event.listens_for(db.session, 'after_flush')
+def _update_counters(session, flush_context):
+    """Apply counter deltas inside the transaction that wrote the rows"""
+    deltas = _collect_deltas(session)
+    if not deltas:
+        return
+    
+    connection = session.connection()
+    for key, (count, amount) in deltas.items():
+        increment(connection, StatsCounter.__table__, 'key', key, count=count, amount=amount)
+    
+    # Kept until commit so the event hub can push the change to dashboards
+    committed = session.info.setdefault('stat_deltas', defaultdict(lambda: [0, 0.0]))
+    for key, (count, amount) in deltas.items():
+        committed[key][0] += count
+        committed[key][1] += amount
+
+def get_dashboard_counters():
+    """Read the dashboard counters with one primary key query"""
+    keys = ['funds', 'transactions'] + [_status_key(status) for status in STATUSES]
+    counters = {
+        counter.key: counter
+        for counter in StatsCounter.query.filter(StatsCounter.key.in_(keys)).all()
+    }
+    
+    def count(key):
+        return counters[key].count if key in counters else 0
+    
+    def amount(key):
+        return counters[key].amount if key in counters else 0
+    
+    return {
+        "total_funds": count('funds'),
+        "total_transactions": count('transactions'),
+        "completed_transactions": count(_status_key('completed')),
+        "total_amount_disbursed": amount(_status_key('completed')),
+        "transactions_by_status": {status: count(_status_key(status)) for status in STATUSES}
+    }
+
+def dashboard_delta(deltas):
+    """Express counter deltas as changes to the get_dashboard_counters fields, dropping zeros"""
+    def count(key):
+        return deltas[key][0] if key in deltas else 0
+    
+    changes = {
+        "total_funds": count('funds'),
+        "total_transactions": count('transactions'),
+        "completed_transactions": count(_status_key('completed')),
+        "total_amount_disbursed": deltas[_status_key('completed')][1] if _status_key('completed') in deltas else 0,
+        "transactions_by_status": {
+            status: count(_status_key(status)) for status in STATUSES if count(_status_key(status))
+        }
+    }
+    return {field: value for field, value in changes.items() if value}
+
+def get_fund_counters(fund_id):
+    """Get the transaction count and disbursed amount of one fund"""
+    counter = db.session.get(StatsCounter, _fund_key(fund_id))
+    return {
+        "fund_id": fund_id,
+        "transaction_count": counter.count if counter else 0,
+        "amount_disbursed": counter.amount if counter else 0
+    }
+
+def stats_initialized():
+    """Check whether the counters have been built at least once"""
+    return db.session.query(StatsCounter.key).filter_by(key='funds').first() is not None
+
+def rebuild_stats():
+    """Recompute every counter from the Fund and Transaction tables"""
+    try:
+        connection = db.session.connection()
+        if connection.dialect.name == 'postgresql':
+            # Writers block on their counter upserts until the rebuild commits
+            connection.exec_driver_sql('LOCK TABLE stats_counter IN SHARE ROW EXCLUSIVE MODE')
+        
+        StatsCounter.query.delete()
+        
+        counters = defaultdict(lambda: [0, 0.0])
+        counters['funds'][0] = Fund.query.count()
+        for (fund_id,) in db.session.query(Fund.id):
+            counters[_fund_key(fund_id)]
+        
+        rows = db.session.query(
+            Transaction.fund_id,
+            Transaction.status,
+            db.func.count(Transaction.id),
+            db.func.coalesce(db.func.sum(Transaction.amount), 0)
+        ).group_by(Transaction.fund_id, Transaction.status)
+        
+        for fund_id, status, count, amount in rows:
+            status = status or 'pending'
+            counters['transactions'][0] += count
+            counters[_status_key(status)][0] += count
+            counters[_status_key(status)][1] += amount
+            counters[_fund_key(fund_id)][0] += count
+            if status == 'completed':
+                counters[_fund_key(fund_id)][1] += amount
+        
+        for status in STATUSES:
+            counters[_status_key(status)]
+        
+        db.session.execute(
+            StatsCounter.__table__.insert(),
+            [{"key": key, "count": count, "amount": amount} for key, (count, amount) in counters.items()]
+        )
+        # Invalidate cached dashboard responses built from the old counters
+        bump(connection, 'fund', 'transaction')
+        db.session.commit()
+        logger.info(f"Rebuilt {len(counters)} dashboard counters")
+        return len(counters)
+        
+    except Exception:
+        db.session.rollback()
+        raise
@@ -0,0 +1,32 @@
+from sqlalchemy import event
+from models import db, Fund, Transaction, AuditLog, TableVersion
+from upsert import increment
+
+TRACKED = {
+    Fund: 'fund',
+    Transaction: 'transaction',
+    AuditLog: 'audit_log'
+}
+
+def bump(connection, *names):
+    """Increment the version of each named table inside the caller's transaction"""
+    for name in sorted(set(names)):  # fixed order so concurrent writers cannot deadlock
+        increment(connection, TableVersion.__table__, 'name', name, version=1)
+
+def get_versions():
+    """Read every table version with one query"""
+    return dict(db.session.query(TableVersion.name, TableVersion.version).all())
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_flushed_tables(session, flush_context):
+    """Bump the tables of every ORM row written by this flush"""
+    names = set()
+    for obj in list(session.new) + list(session.deleted):
+        if type(obj) in TRACKED:
+            names.add(TRACKED[type(obj)])
+    for obj in session.dirty:
+        if type(obj) in TRACKED and session.is_modified(obj):
+            names.add(TRACKED[type(obj)])
+    
+    if names:
+        bump(session.connection(), *names)
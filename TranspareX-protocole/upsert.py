@@ -0,0 +1,26 @@
+from importlib import import_module
+
+def increment(connection, table, key_column, key, **amounts):
+    """Add amounts to columns of the row whose key_column is key, creating it if needed.
+    
+    A new row starts at the amounts. PostgreSQL and SQLite do this in one
+    INSERT ... ON CONFLICT statement, so concurrent writers never race on the
+    insert; other databases UPDATE first and INSERT when no row matched.
+    """
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        # Resolved at call time, importing every dialect up front slows app startup
+        insert = import_module(f'sqlalchemy.dialects.{connection.dialect.name}').insert
+        stmt = insert(table).values({key_column: key, **amounts})
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c[key_column]],
+            set_={column: table.c[column] + stmt.excluded[column] for column in amounts}
+        ))
+        return
+    
+    result = connection.execute(
+        table.update()
+        .where(table.c[key_column] == key)
+        .values({column: table.c[column] + amount for column, amount in amounts.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values({key_column: key, **amounts}))